@@ -0,0 +1,73 @@
+"""
+Benchmark chart output formats: render time and payload size
+
+Usage (from the src directory):
+    python benchmarks/chart_formats.py
+    python benchmarks/chart_formats.py --rows 10 100 500 --repeat 10
+
+Renders every chart type in every format (see recipes.utils.CHART_FORMATS)
+from synthetic recipe data and prints the median render time and the size
+of the resulting payload.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'recipe_project.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from recipes.utils import CHART_FORMATS, CHART_TYPES, render_chart  # noqa: E402
+
+DIFFICULTIES = ['Easy', 'Medium', 'Intermediate', 'Hard']
+
+
+def make_data(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'name': [f'Recipe {i}' for i in range(rows)],
+        'cooking_time': rng.integers(1, 180, rows),
+        'difficulty': rng.choice(DIFFICULTIES, rows),
+        'ingredient_count': rng.integers(1, 15, rows),
+    })
+
+
+def bench(chart_type, data, output_format, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = render_chart(chart_type, data, output_format, color_scheme='brand')
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), len(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    # Warm up fonts and the reusable figures
+    for chart_type in CHART_TYPES.values():
+        render_chart(chart_type, make_data(5), 'png')
+
+    print(f"{'rows':>6} {'chart':>6} {'format':>7} {'median ms':>10} {'bytes':>10}")
+    for rows in args.rows:
+        data = make_data(rows)
+        for name, chart_type in CHART_TYPES.items():
+            for output_format in CHART_FORMATS:
+                seconds, size = bench(chart_type, data, output_format, args.repeat)
+                print(f"{rows:>6} {name:>6} {output_format:>7} {seconds * 1000:>10.1f} {size:>10}")
+
+
+if __name__ == '__main__':
+    main()
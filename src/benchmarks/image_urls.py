@@ -0,0 +1,118 @@
+"""
+Benchmark recipe image URL resolution while rendering a 1,000-card list
+
+Usage (from the src directory):
+    python benchmarks/image_urls.py
+    python benchmarks/image_urls.py --cards 1000 --repeat 20 --manifest
+
+Renders the card markup of list.html (media_to_static + recipe_picture)
+for synthetic recipes using the shipped images, once with the LRU cache of
+recipes.images and once resolving every URL from scratch, and prints the
+median render time and the median time of the image_url() calls alone.
+
+--manifest collects the static files into a temporary directory and
+resolves through the manifest storage used in production; otherwise the
+development finders are used.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'recipe_project.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.template import Context, Template  # noqa: E402
+from django.test import override_settings  # noqa: E402
+
+from recipes import images  # noqa: E402
+
+CARDS = Template(
+    "{% load recipe_extras %}{% for recipe in recipes %}"
+    "<a href=\"/recipes/{{ recipe.pk }}/\">{% recipe_picture recipe.image_renditions "
+    "recipe.recipe_image|media_to_static recipe.name \"object-cover w-full h-full aspect-square\" "
+    "\"(min-width: 1024px) 20vw, 384px\" %}</a>{% endfor %}"
+)
+
+
+def make_cards(count):
+    shipped = sorted(
+        f'recipes/{name}' for name in os.listdir(Path(settings.BASE_DIR) / 'static' / 'images' / 'recipes')
+    )
+    return [
+        SimpleNamespace(pk=i, name=f'Recipe {i}', recipe_image=shipped[i % len(shipped)], image_renditions={})
+        for i in range(count)
+    ]
+
+
+def bench(recipes, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        CARDS.render(Context({'recipes': recipes}))
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def bench_lookups(recipes, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for recipe in recipes:
+            images.image_url(recipe.recipe_image)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def run(recipes, repeat):
+    """Return {'render': (uncached, cached), 'lookups': (uncached, cached)} median seconds"""
+    images.clear_image_url_cache()
+    CARDS.render(Context({'recipes': recipes}))  # warm up
+    cached = (bench(recipes, repeat), bench_lookups(recipes, repeat))
+    # Same template, every URL resolved from scratch
+    with mock.patch.object(images, 'cached_image_url', images.cached_image_url.__wrapped__):
+        uncached = (bench(recipes, repeat), bench_lookups(recipes, repeat))
+    return {'render': (uncached[0], cached[0]), 'lookups': (uncached[1], cached[1])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cards', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--manifest', action='store_true', help="Resolve through the production manifest storage")
+    args = parser.parse_args()
+
+    recipes = make_cards(args.cards)
+    if args.manifest:
+        static_root = tempfile.mkdtemp()
+        storages = dict(settings.STORAGES, staticfiles={'BACKEND': 'recipes.storage.ManifestStaticFilesStorage'})
+        try:
+            with override_settings(STATIC_ROOT=static_root, STORAGES=storages, DEBUG=False):
+                call_command('collectstatic', interactive=False, verbosity=0)
+                results = run(recipes, args.repeat)
+        finally:
+            shutil.rmtree(static_root)
+    else:
+        results = run(recipes, args.repeat)
+
+    mode = 'manifest' if args.manifest else 'finders'
+    print(f"{args.cards} cards, {mode}, median of {args.repeat} renders")
+    for label, (uncached, cached) in (('template render', results['render']), ('image_url only', results['lookups'])):
+        print(f"  {label:<16} resolved per card {uncached * 1000:8.1f} ms, "
+              f"LRU cache {cached * 1000:8.1f} ms ({uncached / cached:.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
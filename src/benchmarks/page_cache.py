@@ -0,0 +1,100 @@
+"""
+Benchmark the per-view page cache: requests per second with and without it
+
+Usage (from the src directory):
+    python benchmarks/page_cache.py
+    python benchmarks/page_cache.py --requests 2000
+    DEBUG=False CACHE_URL=file:///tmp/nomalyze-cache python benchmarks/page_cache.py
+
+Requests the cached pages (home, about) and a recipe detail page through
+the Django test client, in the same process, against a throwaway test
+database. "before" runs with the dummy cache backend (nothing is ever
+cached), "after" with the configured CACHES, for an anonymous visitor and
+a logged-in user. Run it with DEBUG=False to measure the production
+profile (cached template loader, and cached_db sessions when CACHE_URL is
+set); that profile uses the static files manifest, so run collectstatic
+first.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'recipe_project.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.cache import caches  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from recipes.models import Recipe  # noqa: E402
+
+DUMMY_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+    for alias in settings.CACHES
+}
+
+
+def requests_per_second(client, url, count):
+    client.get(url)  # warm up
+    start = time.perf_counter()
+    for _ in range(count):
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+    return count / (time.perf_counter() - start)
+
+
+def run(pages, count):
+    return {label: requests_per_second(client, url, count) for label, (client, url) in pages.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500, help="Requests per page and run (default: 500)")
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        User.objects.create_user(username='bench', password='bench-pass-123')
+        recipe = Recipe.objects.create(
+            name="Benchmark Soup", ingredients="water, salt, onion, carrot", cooking_time=25,
+            short_description="A recipe to benchmark",
+        )
+        anonymous = Client()
+        user = Client()
+        user.login(username='bench', password='bench-pass-123')
+        pages = {
+            'home (anonymous)': (anonymous, reverse('recipes:home')),
+            'about (anonymous)': (anonymous, reverse('about')),
+            'home (user)': (user, reverse('recipes:home')),
+            'about (user)': (user, reverse('about')),
+            'detail (user)': (user, reverse('recipes:recipe-detail', args=[recipe.pk])),
+        }
+
+        with override_settings(CACHES=DUMMY_CACHES):
+            before = run(pages, args.requests)
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        after = run(pages, args.requests)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    backend = settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1]
+    print(f"{args.requests} requests per page, cache backend: {backend}")
+    print(f"{'page':<20}{'before req/s':>14}{'after req/s':>14}{'speedup':>10}")
+    for label, rate in after.items():
+        print(f"{label:<20}{before[label]:>14.0f}{rate:>14.0f}{rate / before[label]:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -74,6 +74,7 @@ TEMPLATES = [
                 'django.template.context_processors.media',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'recipes.context_processors.page_chrome',
             ],
         },
     },
@@ -107,6 +108,50 @@ else:
     }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# CACHE_URL picks a cache shared by all worker processes:
+#   redis://host:6379/0 (or rediss://)   Redis or a Redis-compatible server
+#   file:///var/tmp/nomalyze-cache        file based, for a single host
+# Without it every process keeps its own local-memory cache
+CACHE_URL = os.getenv('CACHE_URL', '')
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+elif CACHE_URL.startswith('file://'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_URL.removeprefix('file://'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Web worker processes (gunicorn reads the same variable). Above 1 the
+# chart store needs CACHE_URL, see recipes.checks
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', '1'))
+
+# Seconds the home and about pages are kept by cache_page
+RECIPE_PAGE_CACHE_TIMEOUT = int(os.getenv('RECIPE_PAGE_CACHE_TIMEOUT', '300'))
+
+# Production with a shared cache: sessions read from the cache and written
+# through to the database. A per-process cache would keep stale copies in
+# each worker, so without CACHE_URL sessions stay in the database.
+# (Templates need nothing here: Django caches compiled templates when DEBUG is off.)
+if not DEBUG and CACHE_URL.startswith(('redis://', 'rediss://', 'file://')):
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -141,6 +186,17 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
+# Uploads (recipe images and their renditions) get content-hashed names,
+# so their URLs never change meaning and can be cached forever
+STORAGES = {
+    'default': {
+        'BACKEND': 'recipes.storage.HashedFileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [
@@ -149,8 +205,11 @@ STATICFILES_DIRS = [
 
 # Static files configuration for production
 if not DEBUG:
-    # Use WhiteNoise to serve static files in production
-    STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+    # Use WhiteNoise to serve static files in production: hashed names from
+    # the manifest, served with far-future immutable cache headers
+    STORAGES['staticfiles'] = {
+        'BACKEND': 'recipes.storage.ManifestStaticFilesStorage',
+    }
     # Ensure static files are served with proper headers
     STATICFILES_FINDERS = [
         'django.contrib.staticfiles.finders.FileSystemFinder',
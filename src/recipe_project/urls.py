@@ -15,10 +15,10 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from recipe_project.views import login_view, logout_view, about_view
+from recipe_project.views import login_view, logout_view, about_view, media_view
 
 
 urlpatterns = [
@@ -29,8 +29,11 @@ urlpatterns = [
     path('about/', about_view, name='about'),
 ]
 
-# for media files - serve in both development and production
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Uploaded media (content-hashed names, immutable cache headers) - in both
+# development and production, without Django's development static view
+urlpatterns += [
+    re_path(rf'^{settings.MEDIA_URL.lstrip("/")}(?P<path>.+)$', media_view, name='media'),
+]
 
 # Serve static files during development
 if settings.DEBUG:
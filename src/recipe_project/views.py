@@ -1,7 +1,20 @@
+import mimetypes
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404
 from django.shortcuts import render, redirect
+from django.utils.cache import patch_cache_control
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.cache import cache_page
+from django.views.decorators.vary import vary_on_cookie
+
+from recipes.storage import is_hashed_name
+
+# Hashed media files never change, let browsers and CDNs keep them for a year
+MEDIA_MAX_AGE = 60 * 60 * 24 * 365
 
 
 def login_view(request):
@@ -36,5 +49,24 @@ def logout_view(request):
     logout(request)
     return render(request, "auth/logout.html")
 
+@cache_page(getattr(settings, 'RECIPE_PAGE_CACHE_TIMEOUT', 300))
+@vary_on_cookie
 def about_view(request):
     return render(request, "about.html")
+
+def media_view(request, path):
+    """
+    Serve an uploaded file from the media storage
+
+    Content-hashed names (see recipes.storage) are immutable, so after the
+    first request browsers and CDNs do not come back for them.
+    """
+    if not default_storage.exists(path):
+        raise Http404("File not found")
+    content_type, encoding = mimetypes.guess_type(path)
+    response = FileResponse(default_storage.open(path), content_type=content_type or 'application/octet-stream')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if is_hashed_name(path):
+        patch_cache_control(response, public=True, max_age=MEDIA_MAX_AGE, immutable=True)
+    return response
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'recipe_project.settings')
 
 application = get_wsgi_application()
+
+# Warm the chart rendering pool before the first search needs it
+from recipes.chart_executor import chart_executor  # noqa: E402
+
+chart_executor.start()
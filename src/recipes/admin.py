@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Recipe
+from .models import Recipe, Ingredient, RenditionJob
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
@@ -20,3 +20,16 @@ class RecipeAdmin(admin.ModelAdmin):
             'fields': ('references',)
         }),
     )
+
+
+@admin.register(Ingredient)
+class IngredientAdmin(admin.ModelAdmin):
+    list_display = ['name']
+    search_fields = ['name']
+
+
+@admin.register(RenditionJob)
+class RenditionJobAdmin(admin.ModelAdmin):
+    list_display = ['image_name', 'recipe', 'status', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['status']
+    readonly_fields = ['recipe', 'image_name', 'status', 'attempts', 'error', 'created_at', 'started_at', 'finished_at']
@@ -0,0 +1,167 @@
+"""
+Recipe analytics computed by the database
+
+summarize_recipes() reduces any Recipe queryset to a few small aggregates
+(GROUP BY queries), so charting "all recipes" costs memory proportional to
+the number of groups rather than the number of recipes:
+
+    difficulty_counts       [[difficulty, count], ...] in DIFFICULTY_LEVELS order
+    cooking_time_histogram  {'bucket_size': minutes, 'buckets': [[start, count], ...]}
+    by_ingredient_count     [[ingredient_count, count, avg_cooking_time, median], ...]
+    bar                     data for the "#1" bar chart in the mode picked by
+                            pick_bar_mode: {'mode': 'recipes', 'recipes': [[name,
+                            cooking_time], ...]}, {'mode': 'extremes', 'slowest':
+                            [...], 'quickest': [...]} or {'mode': 'histogram'}
+
+The median cooking time per ingredient count uses PERCENTILE_CONT and is
+only computed on PostgreSQL (None elsewhere). The summary is a plain,
+JSON serializable dict; recipes.utils draws charts from it.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Aggregate, Avg, Count, F, FloatField, Max, Min
+
+from .difficulty import DIFFICULTY_LEVELS
+
+# Candidate histogram bucket widths in minutes, smallest first
+BUCKET_SIZES = (1, 2, 5, 10, 15, 30, 60, 120, 240)
+MAX_BUCKETS = 12
+
+# Bar chart modes, from most to least detailed
+BAR_MODES = ('recipes', 'extremes', 'histogram')
+
+
+class Percentile(Aggregate):
+    """PERCENTILE_CONT(percentile) WITHIN GROUP (ORDER BY expression), PostgreSQL only"""
+    function = 'PERCENTILE_CONT'
+    name = 'Percentile'
+    output_field = FloatField()
+    template = '%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+
+    def __init__(self, expression, percentile, **extra):
+        percentile = float(percentile)
+        if not 0 <= percentile <= 1:
+            raise ValueError("percentile must be between 0 and 1")
+        super().__init__(expression, percentile=percentile, **extra)
+
+
+def is_summary(data):
+    """Whether data is a summary from summarize_recipes (rather than per-recipe rows)"""
+    return isinstance(data, dict) and data.get('kind') == 'summary'
+
+
+def pick_bucket_size(low, high):
+    """Smallest width in BUCKET_SIZES that covers low..high in at most MAX_BUCKETS buckets"""
+    for size in BUCKET_SIZES:
+        if high // size - low // size < MAX_BUCKETS:
+            return size
+    return BUCKET_SIZES[-1]
+
+
+def pick_bar_mode(total):
+    """
+    Pick the bar chart mode for total recipes, so the number of bars (and
+    the render time) stays bounded:
+
+        up to RECIPE_CHART_MAX_BARS (20)        one bar per recipe
+        up to RECIPE_CHART_EXTREMES_MAX (200)   top-N slowest and quickest
+        more                                    cooking time histogram
+    """
+    if total <= getattr(settings, 'RECIPE_CHART_MAX_BARS', 20):
+        return 'recipes'
+    if total <= getattr(settings, 'RECIPE_CHART_EXTREMES_MAX', 200):
+        return 'extremes'
+    return 'histogram'
+
+
+def bar_count(summary):
+    """Number of bars the summary's bar chart will draw"""
+    bar = summary['bar']
+    if bar['mode'] == 'recipes':
+        return len(bar['recipes'])
+    if bar['mode'] == 'extremes':
+        return len(bar['slowest']) + len(bar['quickest'])
+    return len(summary['cooking_time_histogram']['buckets'])
+
+
+def summarize_recipes(queryset, bar_mode=None):
+    """
+    Aggregate a Recipe queryset for the search charts
+
+    Args:
+        queryset: any (filtered) Recipe queryset; its ordering is ignored
+        bar_mode: one of BAR_MODES (default: picked from the result size)
+
+    Returns:
+        dict: the summary described in the module docstring, plus 'total'
+    """
+    queryset = queryset.order_by()
+    stats = queryset.aggregate(total=Count('id'), low=Min('cooking_time'), high=Max('cooking_time'))
+    summary = {
+        'kind': 'summary',
+        'total': stats['total'],
+        'difficulty_counts': [],
+        'cooking_time_histogram': {'bucket_size': None, 'buckets': []},
+        'by_ingredient_count': [],
+        'bar': {'mode': bar_mode or pick_bar_mode(stats['total'])},
+    }
+    if not stats['total']:
+        summary['bar'] = {'mode': 'recipes', 'recipes': []}
+        return summary
+
+    # Slowest first; ties broken by name so equal data gives equal charts
+    rows = queryset.values_list('name', 'cooking_time')
+    slowest = rows.order_by('-cooking_time', 'name', 'id')
+    if summary['bar']['mode'] == 'recipes':
+        summary['bar']['recipes'] = [list(row) for row in slowest[:getattr(settings, 'RECIPE_CHART_MAX_BARS', 20)]]
+    elif summary['bar']['mode'] == 'extremes':
+        top_n = getattr(settings, 'RECIPE_CHART_TOP_N', 10)
+        summary['bar']['slowest'] = [list(row) for row in slowest[:top_n]]
+        quickest = rows.order_by('cooking_time', 'name', 'id')[:max(0, min(top_n, stats['total'] - top_n))]
+        summary['bar']['quickest'] = [list(row) for row in quickest][::-1]
+
+    counts = dict(queryset.values_list('difficulty').annotate(count=Count('id')))
+    summary['difficulty_counts'] = [[level, counts[level]] for level in DIFFICULTY_LEVELS if counts.get(level)]
+
+    bucket_size = pick_bucket_size(stats['low'], stats['high'])
+    # Integer division on an integer column: the bucket index
+    buckets = (
+        queryset.annotate(bucket=F('cooking_time') / bucket_size)
+        .values_list('bucket')
+        .annotate(count=Count('id'))
+        .order_by('bucket')
+    )
+    summary['cooking_time_histogram'] = {
+        'bucket_size': bucket_size,
+        'buckets': [[bucket * bucket_size, count] for bucket, count in buckets],
+    }
+
+    aggregates = {'count': Count('id'), 'avg': Avg('cooking_time')}
+    with_median = connections[queryset.db].vendor == 'postgresql'
+    if with_median:
+        aggregates['median'] = Percentile('cooking_time', 0.5)
+    rows = (
+        queryset.values('ingredient_count')
+        .annotate(**aggregates)
+        .order_by('ingredient_count')
+    )
+    summary['by_ingredient_count'] = [
+        [
+            row['ingredient_count'],
+            row['count'],
+            # float(): PostgreSQL may hand back Decimals, which JSON cannot encode
+            round(float(row['avg']), 1),
+            round(float(row['median']), 1) if with_median else None,
+        ]
+        for row in rows
+    ]
+    return summary
+
+
+def fingerprint_summary(summary):
+    """Content fingerprint of a summary: equal summaries draw equal charts"""
+    raw = json.dumps(summary, sort_keys=True, separators=(',', ':')).encode()
+    return hashlib.sha1(raw).hexdigest()
@@ -0,0 +1,57 @@
+"""
+In-process cache for rendered recipe charts
+
+ChartStore keeps hot charts here in front of the shared cache. Chart keys
+are derived from everything the chart is drawn from (see
+recipes.chart_store.chart_key), so an entry never goes stale and recipe
+changes do not clear the cache. Entries are evicted least-recently-used
+once the cache is full and expire after a timeout.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class ChartCache:
+    """Thread-safe LRU cache with a per-entry time to live"""
+
+    def __init__(self, max_entries=128, timeout=600, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (self._clock() + self.timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+chart_cache = ChartCache(
+    max_entries=getattr(settings, 'RECIPE_CHART_CACHE_SIZE', 128),
+    timeout=getattr(settings, 'RECIPE_CHART_CACHE_TIMEOUT', 600),
+)
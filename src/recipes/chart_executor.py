@@ -0,0 +1,202 @@
+"""
+Process pool for rendering search charts concurrently
+
+Drawing is CPU bound and holds the GIL, so threads would not overlap the
+renders. Instead each chart is rendered in a worker process of a long-lived
+pool whose workers import matplotlib (Agg) and pandas up front. Only the
+columns a chart needs are sent over, as plain lists / NumPy arrays.
+
+wsgi.py starts the pool when a web process loads, so spawning the workers
+and their imports (seconds) is not paid by the first search.
+
+Settings:
+    RECIPE_CHART_WORKERS: pool size; 0 or 1 renders in the calling thread
+        (default: up to 3, one per chart, bounded by the CPU count)
+    RECIPE_CHART_RENDER_TIMEOUT: seconds to wait for a batch of charts
+"""
+import atexit
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+from django.conf import settings
+
+from .analytics import is_summary
+
+logger = logging.getLogger(__name__)
+
+# Columns each chart type reads from the recipe data
+CHART_COLUMNS = {
+    '#1': ('name', 'cooking_time'),
+    '#2': ('difficulty',),
+    '#3': ('ingredient_count', 'cooking_time'),
+}
+
+NUMERIC_COLUMNS = ('cooking_time', 'ingredient_count')
+
+
+def to_columns(chart_type, data):
+    """
+    Extract the columns chart_type needs from a DataFrame (or mapping) as
+    compact arrays; database summaries are small and sent as they are
+    """
+    if is_summary(data):
+        return data
+    columns = {}
+    for column in CHART_COLUMNS.get(chart_type, ()):
+        if column not in data:
+            continue
+        if column in NUMERIC_COLUMNS:
+            columns[column] = np.asarray(data[column], dtype=np.int32)
+        else:
+            columns[column] = [str(value) for value in data[column]]
+    return columns
+
+
+def warm_worker(worker_pids=None):
+    """Pool initializer: report the worker's pid and pay the matplotlib/pandas import cost once"""
+    if worker_pids is not None:
+        worker_pids.put(os.getpid())
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.backends.backend_agg  # noqa: F401
+    import matplotlib.figure  # noqa: F401
+    import pandas  # noqa: F401
+
+
+def render_chart_columns(chart_type, columns, kwargs):
+    """Worker entry point: render one chart from column arrays to bytes"""
+    import pandas as pd
+    from .utils import render_chart
+    data = columns if is_summary(columns) else pd.DataFrame(columns)
+    return render_chart(chart_type, data, **kwargs)
+
+
+class ChartExecutor:
+    """Renders batches of charts, in a process pool when more than one worker is configured"""
+
+    def __init__(self, max_workers=None, timeout=None):
+        if max_workers is None:
+            max_workers = getattr(settings, 'RECIPE_CHART_WORKERS', min(3, os.cpu_count() or 1))
+        self.max_workers = max_workers
+        self.timeout = timeout or getattr(settings, 'RECIPE_CHART_RENDER_TIMEOUT', 10)
+        self._pool = None
+        # Process that started the pool: a forked child (gunicorn --preload) needs its own
+        self._pool_owner = None
+        # Pids reported by the current pool's workers, so stuck ones can be killed
+        self._worker_pids = None
+        self._lock = threading.Lock()
+
+    @property
+    def parallel(self):
+        return self.max_workers > 1
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None or self._pool_owner != os.getpid():
+                context = multiprocessing.get_context('spawn')
+                self._pool_owner = os.getpid()
+                self._worker_pids = context.SimpleQueue()
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=context,
+                    initializer=warm_worker,
+                    initargs=(self._worker_pids,),
+                )
+            return self._pool
+
+    def start(self):
+        """Start the pool and spawn all its workers now instead of on the first batch"""
+        if not self.parallel:
+            return
+        pool = self._get_pool()
+        # Workers are spawned on demand, one per task submitted while none is idle
+        for _ in range(self.max_workers):
+            pool.submit(os.getpid)
+
+    def _reset_pool(self):
+        """Throw away a pool with a stuck or dead worker so the next batch starts clean"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+            worker_pids, self._worker_pids = self._worker_pids, None
+        if pool is None:
+            return
+        while not worker_pids.empty():
+            try:
+                os.kill(worker_pids.get(), signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _render_inline(chart_type, data, kwargs):
+        """Render one chart in the calling thread; None when it fails, like the pool"""
+        from .utils import render_chart
+        try:
+            return render_chart(chart_type, data, **kwargs)
+        except Exception:
+            logger.exception("Chart %s failed to render", chart_type)
+            return None
+
+    def render(self, jobs):
+        """
+        Render several charts at once
+
+        Args:
+            jobs: list of (chart_type, data, kwargs) tuples, data being a
+                DataFrame or a mapping of columns; kwargs go to
+                utils.render_chart (output_format, color_scheme, ...)
+
+        Returns:
+            list: chart bytes per job, in order; None for charts that failed
+            or were not done within RECIPE_CHART_RENDER_TIMEOUT of submission
+        """
+        if not self.parallel or len(jobs) < 2:
+            return [self._render_inline(chart_type, data, kwargs) for chart_type, data, kwargs in jobs]
+
+        pool = self._get_pool()
+        try:
+            futures = [
+                pool.submit(render_chart_columns, chart_type, to_columns(chart_type, data), kwargs)
+                for chart_type, data, kwargs in jobs
+            ]
+        except BrokenProcessPool:
+            # A worker died since the last batch; start over with a new pool
+            self._reset_pool()
+            return self.render(jobs)
+        # One deadline for the whole batch, not one per chart
+        _, not_done = wait(futures, timeout=self.timeout)
+        results = []
+        healthy = not not_done
+        for (chart_type, _, _), future in zip(jobs, futures):
+            if future in not_done:
+                logger.warning("Chart %s timed out after %ss", chart_type, self.timeout)
+                results.append(None)
+                continue
+            try:
+                results.append(future.result())
+            except BrokenProcessPool:
+                logger.exception("Chart %s failed: a worker process died", chart_type)
+                healthy = False
+                results.append(None)
+            except Exception:
+                logger.exception("Chart %s failed to render", chart_type)
+                results.append(None)
+        if not healthy:
+            self._reset_pool()
+        return results
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+chart_executor = ChartExecutor()
+atexit.register(chart_executor.shutdown)
@@ -0,0 +1,96 @@
+"""
+Storage for rendered chart images and search results
+
+recipe_search keeps its results out of the session: the bytes of each
+chart (PNG, SVG or JSON) and the search payload are written to a Django
+cache (the alias named by RECIPE_CHART_STORE_CACHE, "default" unless
+configured) and the session only remembers a short search key. Chart keys
+are derived from the chart inputs, so they double as ETags and can be
+cached forever by browsers/CDNs.
+
+The follow-up requests may be handled by another worker process, so with
+WEB_CONCURRENCY above 1 the cache must be shared (Redis or file based).
+A local-memory cache is refused then, by the recipes.E001 system check and
+by ChartStore.cache.
+
+Rendered charts also go through the in-process ChartCache, which spares a
+cache round-trip for hot charts.
+"""
+import hashlib
+import secrets
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+
+from .chart_cache import chart_cache
+from .checks import unshared_cache_error
+
+CHART_PREFIX = 'recipes:chart:'
+SEARCH_PREFIX = 'recipes:search:'
+
+# Part of every chart key: bump it whenever charts are drawn differently
+# (styling, series, serializers), or browsers keep the old ones for a year
+CHART_RENDERER_VERSION = 2
+
+
+def chart_key(chart_type, color_scheme, fingerprint, output_format='png'):
+    """Content key for a chart drawn from the recipes identified by fingerprint"""
+    raw = f'{CHART_RENDERER_VERSION}|{chart_type}|{color_scheme}|{fingerprint}|{output_format}'.encode()
+    return hashlib.sha1(raw).hexdigest()
+
+
+class ChartStore:
+    """Rendered charts and search payloads shared between worker processes"""
+
+    def __init__(self, alias=None, timeout=None):
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        alias = self.alias or getattr(settings, 'RECIPE_CHART_STORE_CACHE', 'default')
+        error = unshared_cache_error(alias)
+        if error:
+            # Results written by one worker would be missing on the next
+            raise ImproperlyConfigured(f"{error.msg} {error.hint}")
+        return caches[alias]
+
+    @property
+    def ttl(self):
+        return self.timeout or getattr(settings, 'RECIPE_CHART_STORE_TIMEOUT', 3600)
+
+    def get_chart(self, key, output_format=None):
+        """Return the chart bytes stored under key, or None (also when stored in another format)"""
+        stored = chart_cache.get(key)
+        if stored is None:
+            stored = self.cache.get(CHART_PREFIX + key)
+            if stored is not None:
+                chart_cache.set(key, stored)
+        if stored is None:
+            return None
+        stored_format, chart = stored
+        if output_format is not None and output_format != stored_format:
+            return None
+        return chart
+
+    def save_chart(self, key, chart, output_format='png'):
+        """Store chart bytes in output_format (one of utils.CHART_FORMATS) under key"""
+        stored = (output_format, chart)
+        chart_cache.set(key, stored)
+        self.cache.set(CHART_PREFIX + key, stored, self.ttl)
+
+    def has_chart(self, key, output_format=None):
+        return self.get_chart(key, output_format) is not None
+
+    def save_search(self, payload):
+        """Store a search payload and return the short key to keep in the session"""
+        key = secrets.token_urlsafe(12)
+        self.cache.set(SEARCH_PREFIX + key, payload, self.ttl)
+        return key
+
+    def get_search(self, key):
+        return self.cache.get(SEARCH_PREFIX + key) if key else None
+
+
+chart_store = ChartStore()
@@ -0,0 +1,46 @@
+"""
+System checks for the recipes app
+
+recipe_search keeps search payloads and chart images in the cache named by
+RECIPE_CHART_STORE_CACHE (see recipes.chart_store) and the next request,
+possibly handled by another worker process, reads them back. Recipe edits
+bump version counters in the cache named by RECIPE_DETAIL_CACHE (see
+recipes.detail_cache), which every worker must see or it keeps serving the
+old detail page. With more than one worker (WEB_CONCURRENCY) both caches
+must be shared between processes: Redis or file based, not local memory.
+"""
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Backends whose entries only the process that wrote them can see
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def unshared_cache_error(alias, setting='RECIPE_CHART_STORE_CACHE', error_id='recipes.E001'):
+    """An Error when alias is a per-process cache but several workers serve requests, else None"""
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if getattr(settings, 'WEB_CONCURRENCY', 1) > 1 and backend in PROCESS_LOCAL_CACHES:
+        return Error(
+            f"{setting} ('{alias}') is a per-process {backend.rsplit('.', 1)[-1]} "
+            f"but WEB_CONCURRENCY is {settings.WEB_CONCURRENCY}.",
+            hint="Set CACHE_URL to a Redis or file cache shared by all worker processes.",
+            id=error_id,
+        )
+    return None
+
+
+@register()
+def check_chart_store_cache(app_configs, **kwargs):
+    error = unshared_cache_error(getattr(settings, 'RECIPE_CHART_STORE_CACHE', 'default'))
+    return [error] if error else []
+
+
+@register()
+def check_detail_cache(app_configs, **kwargs):
+    error = unshared_cache_error(
+        getattr(settings, 'RECIPE_DETAIL_CACHE', 'default'), 'RECIPE_DETAIL_CACHE', 'recipes.E002'
+    )
+    return [error] if error else []
@@ -0,0 +1,27 @@
+"""
+Template context shared by every page
+
+page_chrome() works out once per request whether the page is a hero page
+(full-bleed background, translucent navigation and footer) so base.html's
+get_nav_classes and get_footer_classes tags only look the answer up.
+"""
+
+# URL names of the pages drawn over a hero image
+HERO_PAGES = frozenset({'home', 'login', 'logout'})
+
+HERO_FOOTER_CLASSES = "fixed right-0 z-50 bottom-0 left-0 bg-alternate_a-800/70 backdrop-blur-sm text-accent-300"
+DEFAULT_FOOTER_CLASSES = "bg-alternate_a-100 border-t border-gray-200 text-accent-800"
+
+
+def is_hero_request(request):
+    """Whether request resolved to one of HERO_PAGES"""
+    resolver_match = getattr(request, 'resolver_match', None)
+    return resolver_match is not None and resolver_match.url_name in HERO_PAGES
+
+
+def page_chrome(request):
+    hero_page = is_hero_request(request)
+    return {
+        'hero_page': hero_page,
+        'footer_classes': HERO_FOOTER_CLASSES if hero_page else DEFAULT_FOOTER_CLASSES,
+    }
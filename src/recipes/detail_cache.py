@@ -0,0 +1,97 @@
+"""
+Cache for recipe detail pages
+
+RecipeDetailView reads recipes through a Django cache (the alias named by
+RECIPE_DETAIL_CACHE, "default" unless configured) so popular recipes are
+served without a database query, and detail.html caches its rendered body
+as a template fragment in the same cache.
+
+Both are keyed by the recipe's primary key and a per-recipe version
+counter. Recipe save/delete signals bump the counter once the transaction
+commits (see recipes.signals) and bulk updates bump a generation shared by
+all recipes, so stale entries are never read again and simply expire. Any
+Django cache backend works: file based or Redis (the counter uses
+cache.incr, which is atomic on Redis), and local memory as long as a single
+worker process serves requests (see recipes.checks).
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Recipe
+
+GENERATION_KEY = 'recipes:detail:generation'
+VERSION_PREFIX = 'recipes:detail:version:'
+RECIPE_PREFIX = 'recipes:detail:recipe:'
+# Name of the {% cache %} fragment in detail.html
+FRAGMENT_NAME = 'recipe_detail'
+
+
+class RecipeDetailCache:
+    """Versioned Recipe objects shared between worker processes"""
+
+    def __init__(self, alias=None, timeout=None):
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache_alias(self):
+        return self.alias or getattr(settings, 'RECIPE_DETAIL_CACHE', 'default')
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    @property
+    def ttl(self):
+        return self.timeout or getattr(settings, 'RECIPE_DETAIL_CACHE_TIMEOUT', 3600)
+
+    def _counter(self, key):
+        value = self.cache.get(key)
+        if value is None:
+            # Seeded from the clock: if a counter was evicted, the new one
+            # cannot run into versions that are still cached
+            self.cache.add(key, time.time_ns(), None)
+            value = self.cache.get(key)
+        return value
+
+    def _bump(self, key):
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            # No counter yet, so nothing was cached under it either
+            self.cache.set(key, time.time_ns(), None)
+
+    def get_version(self, pk):
+        """Current version of recipe pk: the cache generation and the recipe's own counter"""
+        found = self.cache.get_many([GENERATION_KEY, VERSION_PREFIX + str(pk)])
+        generation = found.get(GENERATION_KEY) or self._counter(GENERATION_KEY)
+        counter = found.get(VERSION_PREFIX + str(pk)) or self._counter(VERSION_PREFIX + str(pk))
+        return f'{generation}.{counter}'
+
+    def bump_version(self, pk):
+        """Invalidate everything cached for recipe pk"""
+        self._bump(VERSION_PREFIX + str(pk))
+
+    def bump_all(self):
+        """Invalidate every cached recipe, after bulk updates that send no signals"""
+        self._bump(GENERATION_KEY)
+
+    def get_recipe(self, pk):
+        """
+        Return (recipe, version) for pk, from the cache when possible
+
+        Raises:
+            Recipe.DoesNotExist: no recipe with that primary key
+        """
+        version = self.get_version(pk)
+        key = f'{RECIPE_PREFIX}{pk}:{version}'
+        recipe = self.cache.get(key)
+        if recipe is None:
+            recipe = Recipe.objects.get(pk=pk)
+            self.cache.set(key, recipe, self.ttl)
+        return recipe, version
+
+
+detail_cache = RecipeDetailCache()
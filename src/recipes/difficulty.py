@@ -0,0 +1,75 @@
+"""
+Recipe difficulty classification
+
+A recipe is quick when it cooks in under RECIPE_DIFFICULTY_TIME_THRESHOLD
+minutes (default 10) and short when it has fewer than
+RECIPE_DIFFICULTY_INGREDIENT_THRESHOLD ingredients (default 4):
+
+    quick and short     -> Easy
+    quick, not short    -> Medium
+    not quick, short    -> Intermediate
+    neither             -> Hard
+
+The rule is available for a single recipe (Recipe.save), as a NumPy
+function for batches of recipes (import_recipes) and as a SQL CASE
+expression for updating the table in place (recompute_difficulty).
+"""
+import numpy as np
+from django.conf import settings
+from django.db.models import Case, Q, Value, When
+
+DIFFICULTY_LEVELS = ('Easy', 'Medium', 'Intermediate', 'Hard')
+
+
+def get_thresholds(time_threshold=None, ingredient_threshold=None):
+    """Return (time_threshold, ingredient_threshold), defaulting to the settings"""
+    if time_threshold is None:
+        time_threshold = getattr(settings, 'RECIPE_DIFFICULTY_TIME_THRESHOLD', 10)
+    if ingredient_threshold is None:
+        ingredient_threshold = getattr(settings, 'RECIPE_DIFFICULTY_INGREDIENT_THRESHOLD', 4)
+    return time_threshold, ingredient_threshold
+
+
+def difficulty_for(cooking_time, ingredient_count, time_threshold=None, ingredient_threshold=None):
+    """Classify one recipe (one of DIFFICULTY_LEVELS), without NumPy"""
+    time_threshold, ingredient_threshold = get_thresholds(time_threshold, ingredient_threshold)
+    quick = cooking_time < time_threshold
+    short = ingredient_count < ingredient_threshold
+    if quick:
+        return DIFFICULTY_LEVELS[0] if short else DIFFICULTY_LEVELS[1]
+    return DIFFICULTY_LEVELS[2] if short else DIFFICULTY_LEVELS[3]
+
+
+def classify_difficulty(cooking_times, ingredient_counts, time_threshold=None, ingredient_threshold=None):
+    """
+    Classify many recipes at once
+
+    Args:
+        cooking_times: cooking times in minutes (sequence or array)
+        ingredient_counts: number of ingredients, same length
+        time_threshold, ingredient_threshold: override the settings
+
+    Returns:
+        numpy.ndarray: one of DIFFICULTY_LEVELS per recipe
+    """
+    time_threshold, ingredient_threshold = get_thresholds(time_threshold, ingredient_threshold)
+    quick = np.asarray(cooking_times) < time_threshold
+    short = np.asarray(ingredient_counts) < ingredient_threshold
+    return np.select(
+        [quick & short, quick & ~short, ~quick & short],
+        DIFFICULTY_LEVELS[:3],
+        DIFFICULTY_LEVELS[3],
+    )
+
+
+def difficulty_case(time_threshold=None, ingredient_threshold=None):
+    """The classification as a CASE expression over cooking_time and ingredient_count"""
+    time_threshold, ingredient_threshold = get_thresholds(time_threshold, ingredient_threshold)
+    quick = Q(cooking_time__lt=time_threshold)
+    short = Q(ingredient_count__lt=ingredient_threshold)
+    return Case(
+        When(quick & short, then=Value(DIFFICULTY_LEVELS[0])),
+        When(quick, then=Value(DIFFICULTY_LEVELS[1])),
+        When(short, then=Value(DIFFICULTY_LEVELS[2])),
+        default=Value(DIFFICULTY_LEVELS[3]),
+    )
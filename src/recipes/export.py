@@ -0,0 +1,101 @@
+"""
+Recipe catalog export (CSV, JSON Lines, Parquet)
+
+Rows are read with QuerySet.iterator(chunk_size), which uses a server-side
+cursor on PostgreSQL, and written out one row (CSV/JSONL) or one row group
+(Parquet) at a time, so memory stays flat whatever the table size. Used by
+the export_recipes view and management command. The CSV/JSONL columns are
+the ones import_recipes reads, so an export can be imported back.
+
+Parquet needs pyarrow, which is optional: write_parquet raises ImportError
+when it is not installed.
+"""
+import csv
+import json
+
+from .models import Recipe
+
+EXPORT_FIELDS = (
+    'id', 'name', 'short_description', 'ingredients', 'ingredient_count', 'cooking_time',
+    'difficulty', 'likes', 'references', 'recipe_image', 'updated_at',
+)
+STREAM_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+CHUNK_SIZE = 2000
+
+
+def export_rows(queryset=None, chunk_size=CHUNK_SIZE):
+    """Yield one dict of EXPORT_FIELDS per recipe, ordered by id"""
+    if queryset is None:
+        queryset = Recipe.objects.all()
+    rows = queryset.order_by('id').values_list(*EXPORT_FIELDS)
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield dict(zip(EXPORT_FIELDS, row))
+
+
+class Echo:
+    """File-like object whose write() returns the data, for csv.writer in a generator"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    """Yield a CSV document line by line"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow([row[field] for field in EXPORT_FIELDS])
+
+
+def iter_jsonl(rows):
+    """Yield one JSON document per line"""
+    for row in rows:
+        yield json.dumps(row, default=str, ensure_ascii=False) + '\n'
+
+
+STREAM_WRITERS = {
+    'csv': iter_csv,
+    'jsonl': iter_jsonl,
+}
+
+
+def write_parquet(rows, path, row_group_size=CHUNK_SIZE):
+    """
+    Write rows to a Parquet file, one row group per row_group_size rows
+
+    Returns:
+        int: number of rows written
+    """
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    written = 0
+    chunk = []
+
+    def flush():
+        nonlocal writer
+        frame = pd.DataFrame.from_records(chunk, columns=EXPORT_FIELDS)
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(path, table.schema)
+        writer.write_table(table.cast(writer.schema))
+
+    try:
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= row_group_size:
+                flush()
+                written += len(chunk)
+                chunk = []
+        if chunk or writer is None:
+            flush()
+            written += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return written
@@ -42,6 +42,16 @@ class RecipeSearchForm(forms.Form):
         })
     )
     
+    ingredient_count_max = forms.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=100,
+        widget=forms.NumberInput(attrs={
+            'placeholder': 'Max number of ingredients',
+            # 'class': INPUT_CLASSES
+        })
+    )
+    
     difficulty = forms.ChoiceField(
         choices=DIFFICULTY_CHOICES,
         required=False
@@ -0,0 +1,82 @@
+"""
+URLs of recipe images
+
+Recipe.recipe_image names either an image shipped with the app
+(static/images/<name>) or an upload in the media storage. image_url()
+resolves both to a URL that can be cached forever:
+
+    shipped images   the static files storage; in production that is
+                     WhiteNoise's manifest storage, whose hashed names it
+                     serves with far-future, immutable cache headers
+    uploads          the media storage (HashedFileSystemStorage), whose
+                     names carry a content hash; served by media_view
+
+Names that resolve to neither get the placeholder image.
+
+Resolved URLs are kept in a process-wide LRU cache, since a list page
+resolves one per card. Names that fall back to the placeholder are not
+cached, so an upload that shows up later is found on the next lookup. The
+cache is cleared when the manifest is loaded or saved (see
+recipes.storage.ManifestStaticFilesStorage) and when the storage settings
+change.
+
+The cache holds RECIPE_IMAGE_URL_CACHE_SIZE entries (default 1024). The
+setting is read once, when this module is imported: changing it later,
+override_settings included, has no effect until the process restarts.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestFilesMixin, staticfiles_storage
+from django.core.files.storage import default_storage
+from django.templatetags.static import static
+
+STATIC_PREFIX = 'images/'
+PLACEHOLDER = 'images/no_picture.png'
+
+
+def static_url(path):
+    """URL of the static file at path, or None when there is no such file"""
+    if isinstance(staticfiles_storage, ManifestFilesMixin):
+        # The manifest lists every collected file and raises for the rest
+        try:
+            return staticfiles_storage.url(path)
+        except ValueError:
+            return None
+    return static(path) if finders.find(path) else None
+
+
+def image_url(name):
+    """URL of the recipe image called name (see the module docstring)"""
+    return resolve_image_url(str(name or ''))
+
+
+def resolve_image_url(name):
+    """URL of the image called name, or of the placeholder when there is none"""
+    try:
+        return cached_image_url(name)
+    except LookupError:
+        # Not cached: the file may be uploaded or restored later
+        return static(PLACEHOLDER)
+
+
+@lru_cache(maxsize=getattr(settings, 'RECIPE_IMAGE_URL_CACHE_SIZE', 1024))
+def cached_image_url(name):
+    # Names are content addressed (static manifest, hashed uploads), so the
+    # URL of a name only changes when the manifest does. Misses raise, and
+    # lru_cache does not keep exceptions.
+    if name.startswith(('http://', 'https://', '/')):
+        return name
+    if name:
+        url = static_url(STATIC_PREFIX + name)
+        if url:
+            return url
+        if default_storage.exists(name):
+            return default_storage.url(name)
+    raise LookupError(name)
+
+
+def clear_image_url_cache():
+    """Forget resolved URLs, when the static files manifest or the storages change"""
+    cached_image_url.cache_clear()
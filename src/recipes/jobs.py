@@ -0,0 +1,89 @@
+"""
+Database-backed queue of image rendition jobs
+
+Recipe.save queues a RenditionJob whenever recipe_image changes, so admin
+saves do not wait for Pillow; `manage.py run_workers` runs the jobs in a
+process pool and process_jobs() runs them in the current process.
+
+A job is claimed by a conditional UPDATE (pending -> running), so several
+workers can share the queue on any database. When it finishes the
+recipe's image_renditions are stored and image_renditions_ready is set,
+unless the recipe has moved on to another image in the meantime. Failed
+jobs are retried up to MAX_ATTEMPTS times; jobs left running by a worker
+that died are put back by requeue_stale().
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .detail_cache import detail_cache
+from .models import Recipe, RenditionJob
+from .renditions import generate_renditions
+
+MAX_ATTEMPTS = 3
+
+
+def claim_jobs(limit):
+    """Mark up to limit pending jobs as running and return them"""
+    claimed = []
+    for job in RenditionJob.objects.filter(status=RenditionJob.PENDING)[:limit]:
+        # Another worker may have taken it since the SELECT
+        if RenditionJob.objects.filter(pk=job.pk, status=RenditionJob.PENDING).update(
+            status=RenditionJob.RUNNING, started_at=timezone.now(), attempts=F('attempts') + 1
+        ):
+            job.status = RenditionJob.RUNNING
+            job.attempts += 1
+            claimed.append(job)
+    return claimed
+
+
+def complete_job(job, renditions):
+    """Store the renditions of a finished job on its recipe"""
+    with transaction.atomic():
+        # updated_at feeds the list ETag, which must change with the markup
+        updated = Recipe.objects.filter(pk=job.recipe_id, recipe_image=job.image_name).update(
+            image_renditions=renditions, image_renditions_ready=True, updated_at=timezone.now()
+        )
+        RenditionJob.objects.filter(pk=job.pk).update(
+            status=RenditionJob.DONE, finished_at=timezone.now(), error=''
+        )
+        if updated:
+            # Queryset updates send no signals; bump once the new row is visible
+            transaction.on_commit(lambda: detail_cache.bump_version(job.recipe_id))
+
+
+def fail_job(job, error):
+    """Put a failed job back in the queue, or give up after MAX_ATTEMPTS"""
+    status = RenditionJob.FAILED if job.attempts >= MAX_ATTEMPTS else RenditionJob.PENDING
+    RenditionJob.objects.filter(pk=job.pk).update(
+        status=status, finished_at=timezone.now(), error=str(error)
+    )
+
+
+def requeue_stale(older_than=timedelta(minutes=10)):
+    """Return jobs stuck in running for longer than older_than to the queue"""
+    return RenditionJob.objects.filter(
+        status=RenditionJob.RUNNING, started_at__lt=timezone.now() - older_than
+    ).update(status=RenditionJob.PENDING)
+
+
+def process_jobs(batch_size=10):
+    """
+    Run every pending job in this process
+
+    Returns:
+        int: number of jobs processed
+    """
+    processed = 0
+    while jobs := claim_jobs(batch_size):
+        for job in jobs:
+            try:
+                renditions = generate_renditions(job.image_name)
+            except Exception as exc:
+                fail_job(job, exc)
+            else:
+                complete_job(job, renditions)
+            processed += 1
+    return processed
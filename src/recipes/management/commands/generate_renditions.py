@@ -0,0 +1,70 @@
+"""
+Generate the responsive image renditions of every recipe
+
+    python manage.py generate_renditions
+    python manage.py generate_renditions --force
+
+Each distinct recipe_image is resized once (recipes often share an image)
+and the result is written to all recipes using it. Without --force only
+recipes whose renditions are not ready are processed. This runs in the
+foreground; saved recipes are normally handled by run_workers. Prints the
+size of the originals next to the size of the 640px WebP renditions, the
+ones a card typically downloads.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.detail_cache import detail_cache
+from recipes.models import Recipe
+from recipes.renditions import generate_renditions, get_storage, source_size
+
+# The rendition compared with the originals in the report
+REPORT_FORMAT = 'webp'
+REPORT_WIDTH = 640
+
+
+class Command(BaseCommand):
+    help = "Generate AVIF/WebP/JPEG renditions of the recipe images"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Regenerate renditions that are already up to date"
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        recipes = Recipe.objects.all() if options['force'] else Recipe.objects.filter(image_renditions_ready=False)
+        names = sorted(set(recipes.values_list('recipe_image', flat=True)))
+
+        storage = get_storage()
+        original_bytes = rendition_bytes = updated = 0
+        for name in names:
+            renditions = generate_renditions(name)
+            # updated_at feeds the list ETag, which must change with the markup
+            updated += Recipe.objects.filter(recipe_image=name).update(
+                image_renditions=renditions, image_renditions_ready=True, updated_at=timezone.now()
+            )
+            if not renditions['formats']:
+                self.stdout.write(f"Skipped {name}: not found, unreadable or already small")
+                continue
+            for width, rendition in renditions['formats'].get(REPORT_FORMAT, []):
+                if width == REPORT_WIDTH:
+                    original_bytes += source_size(name)
+                    rendition_bytes += storage.size(rendition)
+        if updated:
+            # Bulk updates send no signals
+            detail_cache.bump_all()
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated renditions of {len(names)} images for {updated} recipes in {elapsed:.1f}s"
+        ))
+        if rendition_bytes:
+            self.stdout.write(
+                f"Originals: {original_bytes / 1024:.0f} KB, "
+                f"{REPORT_WIDTH}px {REPORT_FORMAT}: {rendition_bytes / 1024:.0f} KB "
+                f"({original_bytes / rendition_bytes:.0f}x smaller)"
+            )
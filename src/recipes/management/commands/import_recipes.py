@@ -0,0 +1,152 @@
+"""
+Bulk import recipes from CSV or JSON Lines
+
+    python manage.py import_recipes recipes.csv
+    python manage.py import_recipes recipes.jsonl --batch-size 5000
+    cat recipes.jsonl | python manage.py import_recipes - --format jsonl
+
+The input is streamed: rows are read, validated and inserted one batch at a
+time, each batch in its own transaction. Recipe.save is bypassed, so the
+fields it derives (ingredient list/count, difficulty, ingredient links) are
+computed here per batch, the difficulty with NumPy over the whole batch.
+
+Columns / keys: name, ingredients, cooking_time (required), short_description,
+references, recipe_image (optional). In JSON Lines, ingredients may also be a
+list of names. Invalid rows, including JSON lines that do not hold an object
+or hold non-text values, are skipped and counted.
+"""
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.difficulty import classify_difficulty
+from recipes.models import Recipe, bulk_sync_ingredients, split_ingredients
+
+FORMATS = ('csv', 'jsonl')
+OPTIONAL_FIELDS = ('short_description', 'references', 'recipe_image')
+
+
+def read_rows(stream, input_format):
+    """Yield one dict per input row (None for a malformed JSON line) without reading the whole file"""
+    if input_format == 'csv':
+        yield from csv.DictReader(stream)
+    else:
+        for line in stream:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    yield None
+
+
+def text_value(value):
+    """value stripped if it is text, else None"""
+    return value.strip() if isinstance(value, str) else None
+
+
+class Command(BaseCommand):
+    help = "Bulk import recipes from a CSV or JSON Lines file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or - for stdin")
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help="Input format (default: from the file extension)"
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Recipes inserted per batch and transaction (default: 1000)"
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        path = options['path']
+        input_format = options['format'] or Path(path).suffix.lstrip('.').lower()
+        if input_format not in FORMATS:
+            raise CommandError("Cannot tell the input format, use --format csv or --format jsonl")
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        start = time.perf_counter()
+        imported = skipped = 0
+        batch = []
+        try:
+            stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        except OSError as exc:
+            raise CommandError(f"Cannot read {path}: {exc}")
+
+        with stream:
+            for line_number, row in enumerate(read_rows(stream, input_format), start=1):
+                recipe = self.build_recipe(row, line_number)
+                if recipe is None:
+                    skipped += 1
+                    continue
+                batch.append(recipe)
+                if len(batch) >= batch_size:
+                    imported += self.insert_batch(batch)
+                    batch = []
+                    self.report_progress(imported, start)
+            if batch:
+                imported += self.insert_batch(batch)
+
+        elapsed = time.perf_counter() - start
+        rate = imported / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} recipes ({skipped} skipped) in {elapsed:.1f}s ({rate:.0f} rows/sec)"
+        ))
+
+    def build_recipe(self, row, line_number):
+        """Validate one input row into an unsaved Recipe, or None to skip it"""
+        if not isinstance(row, dict):
+            if self.verbosity >= 2:
+                self.stderr.write(f"Skipping row {line_number}: not a JSON object")
+            return None
+        name = text_value(row.get('name') or '')
+        ingredients = row.get('ingredients') or ''
+        if isinstance(ingredients, list) and all(isinstance(item, str) for item in ingredients):
+            ingredients = ", ".join(ingredients)
+        ingredients = text_value(ingredients)
+        try:
+            cooking_time = int(row.get('cooking_time'))
+        except (TypeError, ValueError):
+            cooking_time = None
+        if not name or not ingredients or cooking_time is None or not 1 <= cooking_time <= 1440:
+            if self.verbosity >= 2:
+                self.stderr.write(f"Skipping row {line_number}: name, ingredients and cooking_time (1-1440) are required")
+            return None
+        if any(row.get(field) and not isinstance(row[field], str) for field in OPTIONAL_FIELDS):
+            if self.verbosity >= 2:
+                self.stderr.write(f"Skipping row {line_number}: {', '.join(OPTIONAL_FIELDS)} must be text")
+            return None
+
+        recipe = Recipe(name=name[:120], ingredients=ingredients, cooking_time=cooking_time)
+        for field in OPTIONAL_FIELDS:
+            if row.get(field):
+                setattr(recipe, field, row[field])
+        # Fields Recipe.save would derive
+        recipe.ingredient_list = split_ingredients(ingredients)
+        recipe.ingredient_count = len(recipe.ingredient_list)
+        return recipe
+
+    def insert_batch(self, batch):
+        difficulties = classify_difficulty(
+            [recipe.cooking_time for recipe in batch],
+            [recipe.ingredient_count for recipe in batch],
+        )
+        for recipe, difficulty in zip(batch, difficulties):
+            recipe.difficulty = str(difficulty)
+        with transaction.atomic():
+            Recipe.objects.bulk_create(batch)
+            bulk_sync_ingredients(batch)
+        return len(batch)
+
+    def report_progress(self, imported, start):
+        if self.verbosity >= 2:
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"{imported} recipes imported ({imported / elapsed:.0f} rows/sec)")
@@ -0,0 +1,64 @@
+"""
+Recompute the difficulty of every recipe in the database
+
+    python manage.py recompute_difficulty
+    python manage.py recompute_difficulty --chunk-size 50000
+
+Run it after changing RECIPE_DIFFICULTY_TIME_THRESHOLD or
+RECIPE_DIFFICULTY_INGREDIENT_THRESHOLD. The table is walked in primary key
+ranges and each range is reclassified by a single UPDATE ... SET difficulty
+= CASE ... statement; only rows whose difficulty changes are written.
+
+Those rows get a new updated_at, which changes the recipe list ETag and
+the detail pages' Last-Modified, and the shared detail cache moves to a new
+version. Search charts need nothing: they are keyed by the difficulty
+counts they are drawn from (see analytics.fingerprint_summary).
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Min
+from django.db.models.functions import Now
+
+from recipes.detail_cache import detail_cache
+from recipes.difficulty import difficulty_case, get_thresholds
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Reclassify the difficulty of all recipes with the current thresholds"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=10000,
+            help="Primary key range updated per statement (default: 10000)"
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be at least 1")
+
+        start = time.perf_counter()
+        case = difficulty_case()
+        bounds = Recipe.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        updated = 0
+        if bounds['low'] is not None:
+            for low in range(bounds['low'], bounds['high'] + 1, chunk_size):
+                with transaction.atomic():
+                    updated += (
+                        Recipe.objects
+                        .filter(pk__gte=low, pk__lt=low + chunk_size)
+                        .exclude(difficulty=case)
+                        .update(difficulty=case, updated_at=Now())
+                    )
+        if updated:
+            detail_cache.bump_all()
+
+        elapsed = time.perf_counter() - start
+        time_threshold, ingredient_threshold = get_thresholds()
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated {updated} recipes in {elapsed:.1f}s "
+            f"(thresholds: {time_threshold} minutes, {ingredient_threshold} ingredients)"
+        ))
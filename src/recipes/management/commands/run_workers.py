@@ -0,0 +1,111 @@
+"""
+Run the image rendition job queue
+
+    python manage.py run_workers
+    python manage.py run_workers --processes 4 --poll-interval 5
+    python manage.py run_workers --once
+
+This process claims queued RenditionJobs and hands the image work (decode,
+resize, encode) to a pool of worker processes, then records the results.
+Without --once it keeps polling the queue until interrupted. When a worker
+process dies (say it is killed for memory on a huge image) the jobs in
+flight are failed, and so retried up to MAX_ATTEMPTS times, and the pool is
+started again. Jobs left running by a killed run_workers are queued again
+after --stale-after seconds.
+"""
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from recipes.jobs import claim_jobs, complete_job, fail_job, requeue_stale
+from recipes.renditions import generate_renditions
+
+
+def submit(pool, job):
+    """Future of the renditions of job, failed with BrokenProcessPool if the pool is broken"""
+    try:
+        return pool.submit(generate_renditions, job.image_name)
+    except BrokenProcessPool as exc:
+        future = Future()
+        future.set_exception(exc)
+        return future
+
+
+class Command(BaseCommand):
+    help = "Generate queued image renditions in a pool of worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count() or 1,
+            help="Worker processes (default: number of CPUs)"
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help="Seconds to wait when the queue is empty (default: 2)"
+        )
+        parser.add_argument(
+            '--stale-after', type=int, default=600,
+            help="Seconds after which a running job is considered abandoned (default: 600)"
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Exit when the queue is empty instead of polling"
+        )
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        if processes < 1:
+            raise CommandError("--processes must be at least 1")
+        stale_after = timedelta(seconds=options['stale_after'])
+
+        processed = failed = 0
+        start = time.perf_counter()
+        pool = self.start_pool(processes)
+        try:
+            while True:
+                requeue_stale(stale_after)
+                # Two jobs per process keep the pool busy while results are recorded
+                jobs = claim_jobs(processes * 2)
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                broken = False
+                futures = {submit(pool, job): job for job in jobs}
+                for future in as_completed(futures):
+                    job = futures[future]
+                    try:
+                        complete_job(job, future.result())
+                    except Exception as exc:
+                        # A dead worker fails every job still in the pool
+                        broken = broken or isinstance(exc, BrokenProcessPool)
+                        fail_job(job, exc)
+                        failed += 1
+                        self.stderr.write(f"Job {job.pk} ({job.image_name}) failed: {exc}")
+                    processed += 1
+                if broken:
+                    self.stderr.write("A worker process died, restarting the pool")
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = self.start_pool(processes)
+        except KeyboardInterrupt:
+            self.stdout.write("Interrupted, running jobs will be retried later")
+        finally:
+            pool.shutdown()
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {processed} jobs ({failed} failed) in {elapsed:.1f}s with {processes} processes"
+        ))
+
+    def start_pool(self, processes):
+        # Worker processes do not use the database, but must not inherit its connections
+        connections.close_all()
+        return ProcessPoolExecutor(max_workers=processes, initializer=django.setup)
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.5 on 2026-10-18 00:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_remove_recipe_recipe_id_recipe_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ingredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Normalized ingredient name (lowercase, single spaced)', max_length=200, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='recipe_image',
+            field=models.ImageField(default='recipes/no_picture.png', help_text="Upload image or use filename from static/images/recipes/ (e.g., 'recipes/image.jpg')", upload_to='recipes'),
+        ),
+        migrations.CreateModel(
+            name='RecipeIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0, help_text="Position of the ingredient in the recipe's ingredients text")),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_ingredients', to='recipes.ingredient')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_ingredients', to='recipes.recipe')),
+            ],
+            options={
+                'ordering': ['recipe', 'position'],
+            },
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='normalized_ingredients',
+            field=models.ManyToManyField(blank=True, help_text='Normalized ingredients (kept in sync with the ingredients text on save)', related_name='recipes', through='recipes.RecipeIngredient', to='recipes.ingredient'),
+        ),
+        migrations.AddIndex(
+            model_name='recipeingredient',
+            index=models.Index(fields=['ingredient', 'recipe'], name='recipeingredient_lookup_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredient',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique_recipe_ingredient'),
+        ),
+    ]
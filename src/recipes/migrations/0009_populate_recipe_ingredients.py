@@ -0,0 +1,73 @@
+from django.db import migrations
+
+BATCH_SIZE = 2000
+# Ingredient.name max_length when this migration was written
+NAME_MAX_LENGTH = 200
+
+
+# Frozen copies of the recipes.models helpers, so later changes to them do
+# not change what this migration does
+def split_ingredients(value):
+    if not value or value.strip() == "":
+        return []
+    return [ingredient.strip() for ingredient in value.split(",") if ingredient.strip()]
+
+
+def normalize_ingredient_name(name):
+    return " ".join(name.split()).lower()[:NAME_MAX_LENGTH]
+
+
+def populate_recipe_ingredients(apps, schema_editor):
+    """
+    Parse every existing Recipe.ingredients text (same rules as
+    Recipe.return_ingredients_as_list) into Ingredient/RecipeIngredient rows.
+    """
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+
+    def flush(batch):
+        names = {name for _, recipe_names in batch for name in recipe_names}
+        Ingredient.objects.bulk_create(
+            [Ingredient(name=name) for name in names], ignore_conflicts=True
+        )
+        ingredient_ids = dict(Ingredient.objects.filter(name__in=names).values_list('name', 'id'))
+        RecipeIngredient.objects.bulk_create(
+            [
+                RecipeIngredient(recipe_id=recipe_id, ingredient_id=ingredient_ids[name], position=position)
+                for recipe_id, recipe_names in batch
+                for position, name in enumerate(recipe_names)
+            ],
+            ignore_conflicts=True,
+        )
+
+    batch = []
+    rows = Recipe.objects.order_by('pk').values_list('pk', 'ingredients')
+    for recipe_id, ingredients in rows.iterator(chunk_size=BATCH_SIZE):
+        names = []
+        for ingredient in split_ingredients(ingredients):
+            name = normalize_ingredient_name(ingredient)
+            if name not in names:
+                names.append(name)
+        batch.append((recipe_id, names))
+        if len(batch) >= BATCH_SIZE:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+
+def clear_recipe_ingredients(apps, schema_editor):
+    apps.get_model('recipes', 'RecipeIngredient').objects.all().delete()
+    apps.get_model('recipes', 'Ingredient').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_ingredient_recipeingredient'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_recipe_ingredients, clear_recipe_ingredients),
+    ]
@@ -0,0 +1,97 @@
+from django.db import migrations
+
+# The DDL is spelled out here, frozen, rather than imported from
+# recipes.search: later changes to the live index code must not change what
+# this migration does. recipes.search.repair_search_index keeps the index in
+# step after later migrations.
+
+POSTGRES_INSTALL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    """ALTER TABLE recipes_recipe ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(ingredients, '')), 'B')
+        ) STORED""",
+    'CREATE INDEX IF NOT EXISTS recipes_recipe_search_vector_idx ON recipes_recipe USING GIN (search_vector)',
+    'CREATE INDEX IF NOT EXISTS recipes_recipe_name_trgm_idx ON recipes_recipe USING GIN (name gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS recipes_ingredient_name_trgm_idx ON recipes_ingredient USING GIN (name gin_trgm_ops)',
+]
+
+POSTGRES_UNINSTALL = [
+    'DROP INDEX IF EXISTS recipes_ingredient_name_trgm_idx',
+    'DROP INDEX IF EXISTS recipes_recipe_name_trgm_idx',
+    'DROP INDEX IF EXISTS recipes_recipe_search_vector_idx',
+    'ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector',
+]
+
+SQLITE_FTS_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS recipes_recipe_fts USING fts5("
+    "name, ingredients, content='recipes_recipe', content_rowid='id', "
+    "tokenize='trigram case_sensitive 0')"
+)
+
+SQLITE_INSTALL = [
+    """CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_ai AFTER INSERT ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_fts(rowid, name, ingredients) VALUES (new.id, new.name, new.ingredients);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_ad AFTER DELETE ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_fts(recipes_recipe_fts, rowid, name, ingredients)
+        VALUES ('delete', old.id, old.name, old.ingredients);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_au AFTER UPDATE OF name, ingredients ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_fts(recipes_recipe_fts, rowid, name, ingredients)
+        VALUES ('delete', old.id, old.name, old.ingredients);
+        INSERT INTO recipes_recipe_fts(rowid, name, ingredients) VALUES (new.id, new.name, new.ingredients);
+    END""",
+    "INSERT INTO recipes_recipe_fts(recipes_recipe_fts) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_ai',
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_ad',
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_au',
+    'DROP TABLE IF EXISTS recipes_recipe_fts',
+]
+
+
+def install(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRES_INSTALL
+    elif vendor == 'sqlite':
+        try:
+            schema_editor.execute(SQLITE_FTS_TABLE)
+        except Exception:
+            # SQLite built without FTS5 or older than 3.34 (no trigram
+            # tokenizer): searches keep using DatabaseSearchBackend.
+            return
+        statements = SQLITE_INSTALL
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def uninstall(apps, schema_editor):
+    statements = {
+        'postgresql': POSTGRES_UNINSTALL,
+        'sqlite': SQLITE_UNINSTALL,
+    }.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+    """
+    Vendor specific full-text index, outside Django's model state:
+    a generated tsvector column with GIN/pg_trgm indexes on PostgreSQL,
+    a trigram FTS5 table kept in sync by triggers on SQLite.
+    """
+
+    dependencies = [
+        ('recipes', '0009_populate_recipe_ingredients'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
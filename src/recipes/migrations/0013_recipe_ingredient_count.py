@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-18 00:46
+
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+# Frozen copy of recipes.models.split_ingredients, so later changes to it do
+# not change what this migration does
+def split_ingredients(value):
+    if not value or value.strip() == "":
+        return []
+    return [ingredient.strip() for ingredient in value.split(",") if ingredient.strip()]
+
+
+def populate_ingredient_count(apps, schema_editor):
+    """Fill ingredient_list/ingredient_count for existing recipes (same rules as Recipe.save)"""
+    Recipe = apps.get_model('recipes', 'Recipe')
+
+    batch = []
+    rows = Recipe.objects.order_by('pk').only('pk', 'ingredients')
+    for recipe in rows.iterator(chunk_size=BATCH_SIZE):
+        recipe.ingredient_list = split_ingredients(recipe.ingredients)
+        recipe.ingredient_count = len(recipe.ingredient_list)
+        batch.append(recipe)
+        if len(batch) >= BATCH_SIZE:
+            Recipe.objects.bulk_update(batch, ['ingredient_list', 'ingredient_count'])
+            batch = []
+    if batch:
+        Recipe.objects.bulk_update(batch, ['ingredient_list', 'ingredient_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_recipe_name_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_count',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0, editable=False, help_text='Number of ingredients (auto-updated, readonly)'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_list',
+            field=models.JSONField(blank=True, default=list, editable=False, help_text='Ingredients split from the ingredients text (auto-updated, readonly)'),
+        ),
+        migrations.RunPython(populate_ingredient_count, migrations.RunPython.noop),
+    ]
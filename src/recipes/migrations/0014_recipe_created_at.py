@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:12
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def backfill_created_at(apps, schema_editor):
+    """Existing recipes were created at their last modification at the latest"""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Recipe.objects.update(created_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_recipe_ingredient_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, help_text='Creation time (auto-set, readonly)'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_created_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_recipe_created_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized AVIF/WebP/JPEG copies of recipe_image (auto-updated, readonly)'),
+        ),
+    ]
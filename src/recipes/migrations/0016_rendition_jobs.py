@@ -0,0 +1,48 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def mark_ready_renditions(apps, schema_editor):
+    """Renditions made (inline, before the job queue) from the current image are ready"""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    ready = [
+        pk for pk, image, renditions in Recipe.objects.values_list('pk', 'recipe_image', 'image_renditions').iterator()
+        if (renditions or {}).get('source') == image
+    ]
+    for start in range(0, len(ready), 2000):
+        Recipe.objects.filter(pk__in=ready[start:start + 2000]).update(image_renditions_ready=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_recipe_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_renditions_ready',
+            field=models.BooleanField(default=False, editable=False, help_text='Whether image_renditions were generated for the current recipe_image (auto-updated, readonly)'),
+        ),
+        migrations.CreateModel(
+            name='RenditionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image_name', models.CharField(help_text='recipe_image the renditions are made from', max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rendition_jobs', to='recipes.recipe')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.RunPython(mark_ready_renditions, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,73 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
+from django.utils.functional import cached_property
+
+from .difficulty import difficulty_for
+
+def split_ingredients(value):
+    """Split a comma separated ingredients string into a list of stripped names"""
+    if not value or value.strip() == "":
+        return []
+    return [ingredient.strip() for ingredient in value.split(",") if ingredient.strip()]
+
+
+def normalize_ingredient_name(name):
+    """Normalize an ingredient name for lookups: collapse whitespace and lowercase"""
+    return " ".join(name.split()).lower()[:Ingredient.NAME_MAX_LENGTH]
+
+
+def unique_ingredient_names(ingredient_list):
+    """Normalized ingredient names in first-seen order, without duplicates"""
+    names = []
+    for ingredient in ingredient_list:
+        name = normalize_ingredient_name(ingredient)
+        if name not in names:
+            names.append(name)
+    return names
+
+
+def bulk_sync_ingredients(recipes):
+    """
+    Create the Ingredient/RecipeIngredient rows for freshly bulk-created
+    recipes (the bulk equivalent of Recipe.sync_ingredients, which save()
+    runs for single recipes). Recipes must have their pk and ingredient_list set.
+    """
+    recipe_names = [(recipe.pk, unique_ingredient_names(recipe.ingredient_list)) for recipe in recipes]
+    names = {name for _, names in recipe_names for name in names}
+    Ingredient.objects.bulk_create(
+        [Ingredient(name=name) for name in names], ignore_conflicts=True
+    )
+    ingredient_ids = dict(Ingredient.objects.filter(name__in=names).values_list('name', 'id'))
+    RecipeIngredient.objects.bulk_create([
+        RecipeIngredient(recipe_id=recipe_id, ingredient_id=ingredient_ids[name], position=position)
+        for recipe_id, names in recipe_names
+        for position, name in enumerate(names)
+    ])
+
+
+class RecipeQuerySet(models.QuerySet):
+    # Columns shown on recipe cards (list page)
+    CARD_FIELDS = ('id', 'name', 'short_description', 'recipe_image', 'image_renditions')
+    # Columns the search charts are drawn from, in values_list order
+    ANALYTICS_FIELDS = ('id', 'name', 'cooking_time', 'difficulty', 'ingredients', 'ingredient_count', 'updated_at')
+
+    def cards(self):
+        """Recipes with only the card columns loaded (other fields are deferred)"""
+        return self.only(*self.CARD_FIELDS)
+
+    def analytics_rows(self, *extra_fields):
+        """
+        Plain tuples for analysis, without instantiating Recipe objects
+
+        Args:
+            *extra_fields: columns to append after ANALYTICS_FIELDS
+
+        Returns:
+            QuerySet: tuples of ANALYTICS_FIELDS + extra_fields
+        """
+        return self.values_list(*self.ANALYTICS_FIELDS, *extra_fields)
+
 
 class Recipe(models.Model):
     name = models.CharField(
@@ -47,6 +114,53 @@ class Recipe(models.Model):
         default='recipes/no_picture.png',
         help_text="Upload image or use filename from static/images/recipes/ (e.g., 'recipes/image.jpg')"
     )
+    image_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text="Resized AVIF/WebP/JPEG copies of recipe_image (auto-updated, readonly)"
+    )
+    image_renditions_ready = models.BooleanField(
+        default=False,
+        editable=False,
+        help_text="Whether image_renditions were generated for the current recipe_image (auto-updated, readonly)"
+    )
+    ingredient_list = models.JSONField(
+        default=list,
+        blank=True,
+        editable=False,
+        help_text="Ingredients split from the ingredients text (auto-updated, readonly)"
+    )
+    ingredient_count = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        db_index=True,
+        help_text="Number of ingredients (auto-updated, readonly)"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Creation time (auto-set, readonly)"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        help_text="Last modification time (auto-updated, readonly)"
+    )
+    normalized_ingredients = models.ManyToManyField(
+        'Ingredient',
+        through='RecipeIngredient',
+        related_name='recipes',
+        blank=True,
+        help_text="Normalized ingredients (kept in sync with the ingredients text on save)"
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the recipe list seeks on (name, id)
+            models.Index(fields=['name', 'id'], name='recipe_name_id_idx'),
+        ]
     
     def clean(self):
         """Custom validation method"""
@@ -72,31 +186,165 @@ class Recipe(models.Model):
     
     def return_ingredients_as_list(self):
         # Convert ingredients string to list
-        if not self.ingredients or self.ingredients.strip() == "":
-            return []
-        else:
-            return [ingredient.strip() for ingredient in self.ingredients.split(",") if ingredient.strip()]
+        return split_ingredients(self.ingredients)
+
+    @cached_property
+    def ingredient_tuple(self):
+        """
+        The ingredients as a tuple of names for templates, split once at save
+        time (ingredient_list); the text is only split when the list was not loaded.
+        """
+        if 'ingredient_list' in self.get_deferred_fields():
+            return tuple(self.return_ingredients_as_list())
+        return tuple(self.ingredient_list)
+
+    def refresh_ingredient_cache(self):
+        """Update ingredient_list and ingredient_count from the ingredients text"""
+        self.ingredient_list = self.return_ingredients_as_list()
+        self.ingredient_count = len(self.ingredient_list)
+        self.__dict__.pop('ingredient_tuple', None)
+
+    def sync_ingredients(self):
+        """
+        Mirror the comma separated ingredients text into Ingredient/RecipeIngredient rows.
+        The text field stays the editable source; the join table is what searches filter on.
+        """
+        names = unique_ingredient_names(self.ingredient_list)
+
+        current = list(
+            self.recipe_ingredients.order_by('position').values_list('ingredient__name', flat=True)
+        )
+        if current == names:
+            return
+
+        Ingredient.objects.bulk_create(
+            [Ingredient(name=name) for name in names], ignore_conflicts=True
+        )
+        ingredient_ids = dict(Ingredient.objects.filter(name__in=names).values_list('name', 'id'))
+        self.recipe_ingredients.all().delete()
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe=self, ingredient_id=ingredient_ids[name], position=position)
+            for position, name in enumerate(names)
+        ])
     
-    def calculate_difficulty(self):
+    def calculate_difficulty(self, num_ingredients=None):
         # Calculate difficulty based on cooking time and number of ingredients
-        # Use the helper method to get ingredients as a list
-        ingredients_list = self.return_ingredients_as_list()
-        num_ingredients = len(ingredients_list)
-        
-        if self.cooking_time < 10 and num_ingredients < 4:
-            return "Easy"
-        elif self.cooking_time < 10 and num_ingredients >= 4:
-            return "Medium"
-        elif self.cooking_time >= 10 and num_ingredients < 4:
-            return "Intermediate"
-        elif self.cooking_time >= 10 and num_ingredients >= 4:
-            return "Hard"
-        
+        # Use the helper method to get ingredients as a list unless the count is known
+        if num_ingredients is None:
+            num_ingredients = len(self.return_ingredients_as_list())
+        # Same rule as the bulk paths (see recipes.difficulty)
+        return difficulty_for(self.cooking_time, num_ingredients)
     
+    def reset_image_renditions(self):
+        """
+        Drop the renditions of the previous image. New ones are made off the
+        request path by a RenditionJob (see recipes.jobs); until then the
+        templates show the original image.
+        """
+        # pre_save stores a new upload, so the job knows its final path
+        image = self._meta.get_field('recipe_image').pre_save(self, self._state.adding)
+        self.image_renditions = {'source': image.name, 'formats': {}}
+        self.image_renditions_ready = False
+
     def save(self, *args, **kwargs):
-        # Auto-calculate difficulty before saving
-        self.difficulty = self.calculate_difficulty()
-        super().save(*args, **kwargs)
+        # Auto-calculate ingredient cache and difficulty before saving
+        self.refresh_ingredient_cache()
+        self.difficulty = self.calculate_difficulty(self.ingredient_count)
+        image_changed = self.image_renditions.get('source') != self.recipe_image.name
+        if image_changed:
+            self.reset_image_renditions()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.sync_ingredients()
+            if image_changed:
+                RenditionJob.objects.create(recipe=self, image_name=self.recipe_image.name)
     
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+
+class Ingredient(models.Model):
+    NAME_MAX_LENGTH = 200
+
+    name = models.CharField(
+        max_length=NAME_MAX_LENGTH,
+        unique=True,
+        help_text="Normalized ingredient name (lowercase, single spaced)"
+    )
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class RecipeIngredient(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='recipe_ingredients'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='recipe_ingredients'
+    )
+    position = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Position of the ingredient in the recipe's ingredients text"
+    )
+
+    class Meta:
+        ordering = ['recipe', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['recipe', 'ingredient'], name='unique_recipe_ingredient'),
+        ]
+        indexes = [
+            # Ingredient filters walk ingredient -> recipe, so lead with ingredient
+            models.Index(fields=['ingredient', 'recipe'], name='recipeingredient_lookup_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe} - {self.ingredient}"
+
+
+class RenditionJob(models.Model):
+    """A queued request to generate the renditions of a recipe image, run by run_workers"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='rendition_jobs'
+    )
+    image_name = models.CharField(
+        max_length=255,
+        help_text="recipe_image the renditions are made from"
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        db_index=True
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.image_name} ({self.status})"
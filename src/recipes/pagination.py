@@ -0,0 +1,113 @@
+"""
+Keyset (seek) pagination for recipe listings
+
+Pages are ordered by (name, id) and addressed by cursors that encode the
+(name, id) of the last/first row of the neighbouring page, so fetching a
+page is a range scan on the recipe_name_id_idx index whatever its depth,
+instead of the OFFSET scan done by Django's Paginator. Cursors stay valid
+when recipes are added or removed before them.
+"""
+import base64
+import json
+
+from django.db.models import Q
+
+
+def encode_cursor(name, pk):
+    """Encode a (name, id) position as a URL-safe token"""
+    raw = json.dumps([name, pk], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Decode a token made by encode_cursor
+
+    Raises:
+        ValueError: if the token is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        name, pk = json.loads(raw)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(name, str) or not isinstance(pk, int):
+        raise ValueError("Invalid cursor")
+    return name, pk
+
+
+class KeysetPage:
+    """One page of results, usable like django.core.paginator.Page in templates"""
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        last = self.object_list[-1]
+        return encode_cursor(last.name, last.pk)
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        first = self.object_list[0]
+        return encode_cursor(first.name, first.pk)
+
+
+class KeysetPaginator:
+    """Paginate a queryset on (name, id) with after/before cursors"""
+
+    def __init__(self, queryset, page_size):
+        self.queryset = queryset
+        self.page_size = page_size
+
+    def page(self, after=None, before=None):
+        """
+        Fetch the page following the after cursor, or preceding the before
+        cursor (the first page when neither is given)
+
+        Raises:
+            ValueError: if a cursor is malformed
+        """
+        if before:
+            name, pk = decode_cursor(before)
+            rows = list(
+                self.queryset
+                .filter(Q(name__lt=name) | Q(name=name, pk__lt=pk))
+                .order_by('-name', '-pk')[:self.page_size + 1]
+            )
+            has_previous = len(rows) > self.page_size
+            rows = rows[:self.page_size]
+            rows.reverse()
+            return KeysetPage(rows, has_next=True, has_previous=has_previous)
+
+        queryset = self.queryset
+        if after:
+            name, pk = decode_cursor(after)
+            queryset = queryset.filter(Q(name__gt=name) | Q(name=name, pk__gt=pk))
+        rows = list(queryset.order_by('name', 'pk')[:self.page_size + 1])
+        has_next = len(rows) > self.page_size
+        return KeysetPage(rows[:self.page_size], has_next=has_next, has_previous=bool(after))
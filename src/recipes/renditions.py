@@ -0,0 +1,125 @@
+"""
+Responsive renditions of recipe images
+
+generate_renditions() resizes a recipe image to fixed widths
+(RECIPE_RENDITION_WIDTHS, default 320/640/1280) and encodes each width as
+AVIF, WebP and JPEG, skipping the formats this Pillow build cannot write
+and the widths that would upscale the original. Renditions are saved to
+the storage named by RECIPE_RENDITION_STORAGE ("default" unless
+configured) as renditions/<image path>-<width>.<format>, with a content
+hash added by the default HashedFileSystemStorage.
+
+The result is what Recipe.image_renditions stores:
+
+    {'source': 'recipes/tiramisu.jpg',
+     'formats': {'avif': [[320, 'renditions/recipes/tiramisu-320.avif'], ...],
+                 'webp': [...], 'jpeg': [...]}}
+
+The source image is looked up in that storage (uploads) and then in the
+static files (images/<name>, the images shipped in static/images/recipes).
+"""
+import os
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from PIL import Image, ImageOps, features
+
+RENDITION_PREFIX = 'renditions/'
+
+# Pillow format, Pillow feature, content type, save options; best compression first
+RENDITION_FORMATS = {
+    'avif': ('AVIF', 'avif', 'image/avif', {'quality': 50}),
+    'webp': ('WEBP', 'webp', 'image/webp', {'quality': 75, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg', {'quality': 80, 'optimize': True, 'progressive': True}),
+}
+
+
+def get_storage():
+    return storages[getattr(settings, 'RECIPE_RENDITION_STORAGE', 'default')]
+
+
+def get_widths():
+    return sorted(getattr(settings, 'RECIPE_RENDITION_WIDTHS', (320, 640, 1280)))
+
+
+def available_formats():
+    """Names in RENDITION_FORMATS this Pillow build can encode"""
+    return [name for name, (_, feature, _, _) in RENDITION_FORMATS.items() if features.check(feature)]
+
+
+def open_source(name):
+    """Open the original image called name (storage first, then static files), or return None"""
+    if not name:
+        return None
+    storage = get_storage()
+    if storage.exists(name):
+        with storage.open(name) as source:
+            return Image.open(BytesIO(source.read()))
+    path = finders.find(f'images/{name}')
+    return Image.open(path) if path else None
+
+
+def source_size(name):
+    """Size in bytes of the original image called name, 0 when it cannot be found"""
+    storage = get_storage()
+    if name and storage.exists(name):
+        return storage.size(name)
+    path = finders.find(f'images/{name}') if name else None
+    return os.path.getsize(path) if path else 0
+
+
+def rendition_name(name, width, format_name):
+    path = PurePosixPath(name)
+    return f'{RENDITION_PREFIX}{path.with_suffix("")}-{width}.{format_name}'
+
+
+def generate_renditions(name):
+    """
+    Generate the renditions of the image called name
+
+    Returns:
+        dict: {'source': name, 'formats': {...}} as described in the module
+              docstring; 'formats' is empty when the image cannot be found
+              or read, or is already narrower than the smallest width
+    """
+    renditions = {'source': name, 'formats': {}}
+    try:
+        image = open_source(name)
+    except (OSError, Image.DecompressionBombError):
+        return renditions
+    if image is None:
+        return renditions
+
+    widths = [width for width in get_widths() if width < image.width]
+    if not widths:
+        return renditions
+
+    # Let the JPEG decoder downscale while decoding, at most to the largest width
+    image.draft('RGB', (widths[-1], widths[-1] * image.height // image.width))
+    image = ImageOps.exif_transpose(image).convert('RGB')
+
+    storage = get_storage()
+    formats = available_formats()
+    for format_name in formats:
+        renditions['formats'][format_name] = []
+    # Largest first, each width resized from the previous one
+    for width in reversed(widths):
+        image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        for format_name in formats:
+            pillow_format, _, _, options = RENDITION_FORMATS[format_name]
+            buffer = BytesIO()
+            image.save(buffer, pillow_format, **options)
+            target = storage.save(rendition_name(name, width, format_name), ContentFile(buffer.getvalue()))
+            renditions['formats'][format_name].insert(0, [width, target])
+    return renditions
+
+
+def srcset(renditions, format_name):
+    """srcset attribute value for one format of Recipe.image_renditions, '' when there is none"""
+    storage = get_storage()
+    entries = (renditions or {}).get('formats', {}).get(format_name, [])
+    return ', '.join(f'{storage.url(name)} {width}w' for width, name in entries)
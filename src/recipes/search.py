@@ -0,0 +1,383 @@
+"""
+Search backends used by recipe_search
+
+Every backend narrows a Recipe queryset by a name term and a list of
+ingredient terms (AND logic, * and ? wildcards) and, where the database can,
+annotates a ``search_rank`` (higher is better) and orders by it.
+
+- DatabaseSearchBackend: portable ORM lookups (icontains/iregex on the name,
+  normalized ingredient join). Used when nothing better is available.
+- PostgresSearchBackend: the same substring lookups served by pg_trgm
+  indexes, ranked with ts_rank on a generated ``search_vector`` column.
+- SQLiteFTSSearchBackend: an FTS5 (trigram tokenizer) index over name and
+  ingredients kept in sync by triggers, ranked with bm25.
+
+The backend is picked from the database vendor, or forced with the
+RECIPE_SEARCH_BACKEND setting (dotted path to a backend class).
+"""
+import re
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Recipe, RecipeIngredient, normalize_ingredient_name
+
+SEARCH_INDEX_MIGRATION = ('recipes', '0010_recipe_search_index')
+
+RECIPE_TABLE = Recipe._meta.db_table
+FTS_TABLE = f'{RECIPE_TABLE}_fts'
+
+# bm25 column weights for (name, ingredients)
+FTS_WEIGHTS = (10.0, 1.0)
+
+WORD_RE = re.compile(r'\w+')
+
+
+def has_wildcards(term):
+    return '*' in term or '?' in term
+
+
+def escape_like(term):
+    """Escape LIKE's own wildcards (% and _) with a backslash, for ESCAPE '\\'"""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def wildcard_to_like(term):
+    """Translate a * / ? wildcard term into an unanchored LIKE pattern (ESCAPE '\\')"""
+    return '%' + escape_like(term).replace('*', '%').replace('?', '_') + '%'
+
+
+def process_wildcard_search(search_term):
+    """
+    Process wildcard search terms and convert them to Django Q objects
+    
+    Supports:
+    - * wildcards: "pasta*" matches "pasta", "pastas", "pasta-based"
+    - ? wildcards: "pasta?" matches "pasta" but not "pastas"
+    - Partial matching: "pasta" matches "Pasta al Pesto"
+    """
+    if not search_term:
+        return None
+    
+    # Remove extra whitespace
+    search_term = search_term.strip()
+    
+    # Handle wildcards
+    if '*' in search_term or '?' in search_term:
+        # Convert wildcards to regex patterns
+        # * becomes .* (any characters)
+        # ? becomes . (single character)
+        pattern = search_term.replace('*', '.*').replace('?', '.')
+        
+        # Create Q object for regex matching
+        return Q(name__iregex=pattern)
+    else:
+        # Regular partial matching (case-insensitive)
+        return Q(name__icontains=search_term)
+
+def process_ingredient_search(ingredient):
+    """
+    Convert a single ingredient term into a Q object on Recipe
+
+    Matching runs against the normalized Ingredient table and is joined back to
+    recipes through the indexed RecipeIngredient table, instead of scanning
+    every Recipe.ingredients text. Supports the same * and ? wildcards as names.
+    """
+    if not ingredient:
+        return None
+
+    ingredient = normalize_ingredient_name(ingredient)
+    if not ingredient:
+        return None
+
+    if '*' in ingredient or '?' in ingredient:
+        pattern = ingredient.replace('*', '.*').replace('?', '.')
+        links = RecipeIngredient.objects.filter(ingredient__name__iregex=pattern)
+    else:
+        links = RecipeIngredient.objects.filter(ingredient__name__contains=ingredient)
+
+    return Q(id__in=links.values('recipe_id'))
+
+
+class DatabaseSearchBackend:
+    """Portable backend built on plain ORM lookups"""
+
+    ranked = False
+
+    @classmethod
+    def is_available(cls, connection):
+        return True
+
+    def filter_name(self, queryset, term):
+        name_query = process_wildcard_search(term)
+        return queryset.filter(name_query) if name_query else queryset
+
+    def filter_ingredient(self, queryset, term):
+        ingredient_query = process_ingredient_search(term)
+        return queryset.filter(ingredient_query) if ingredient_query else queryset
+
+    def search(self, queryset, name=None, ingredients=()):
+        """
+        Apply the name and ingredient terms to queryset
+
+        Args:
+            queryset: Recipe queryset to narrow down
+            name: recipe name term (may contain wildcards)
+            ingredients: iterable of ingredient terms, all of which must match
+
+        Returns:
+            QuerySet: filtered (and, for ranked backends, ordered) queryset
+        """
+        name = (name or '').strip()
+        if name:
+            queryset = self.filter_name(queryset, name)
+        for ingredient in ingredients:
+            ingredient = ingredient.strip()
+            if ingredient:
+                queryset = self.filter_ingredient(queryset, ingredient)
+        return queryset
+
+
+class PostgresSearchBackend(DatabaseSearchBackend):
+    """
+    Substring search served by pg_trgm, ranked on the ``search_vector`` column
+
+    Name and ingredient terms filter with the same icontains/iregex lookups
+    as DatabaseSearchBackend ("ghetti" finds "Spaghetti"), which the pg_trgm
+    GIN indexes on recipe and ingredient names answer without a sequential
+    scan. The words of the plain terms, as prefix tsquery terms weighted A
+    (name) or B (ingredients), only rank the matches with ts_rank.
+    """
+
+    ranked = True
+
+    @classmethod
+    def is_available(cls, connection):
+        return connection.vendor == 'postgresql'
+
+    @staticmethod
+    def to_tsquery(term, weight):
+        words = WORD_RE.findall(term.lower())
+        return ' & '.join(f'{word}:*{weight}' for word in words)
+
+    def filter_name(self, queryset, term):
+        if has_wildcards(term):
+            return super().filter_name(queryset, term)
+        # icontains compiles to UPPER(name) LIKE, which the trigram index cannot serve; ~* can
+        return queryset.filter(name__iregex=re.escape(term))
+
+    def search(self, queryset, name=None, ingredients=()):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+
+        name = (name or '').strip()
+        ingredients = [ingredient.strip() for ingredient in ingredients if ingredient.strip()]
+        # Terms that are only punctuation match nothing rather than everything
+        if any(not has_wildcards(term) and not WORD_RE.search(term) for term in [name, *ingredients] if term):
+            return queryset.none()
+
+        queryset = super().search(queryset, name=name, ingredients=ingredients)
+
+        terms = [self.to_tsquery(name, 'A')] if name and not has_wildcards(name) else []
+        terms += [self.to_tsquery(ingredient, 'B') for ingredient in ingredients if not has_wildcards(ingredient)]
+        if not terms:
+            return queryset
+
+        # Any matching word adds to the rank; the filters above decide the matches
+        vector = RawSQL(f'"{RECIPE_TABLE}"."search_vector"', [], output_field=SearchVectorField())
+        query = SearchQuery(' | '.join(f'({term})' for term in terms), config='simple', search_type='raw')
+        return (
+            queryset.annotate(search_rank=SearchRank(vector, query))
+            .order_by('-search_rank', 'name', 'id')
+        )
+
+
+class SQLiteFTSSearchBackend(DatabaseSearchBackend):
+    """
+    FTS5 search on the trigram-tokenized ``recipes_recipe_fts`` table
+
+    The trigram tokenizer keeps the substring semantics of the old icontains
+    lookups: plain terms of 3+ characters are answered by MATCH, wildcard and
+    shorter terms by LIKE, which the trigram index also serves.
+    """
+
+    ranked = True
+
+    # Aliases known to have the FTS table, so the check runs once per process
+    _installed_aliases = set()
+
+    @classmethod
+    def is_available(cls, connection):
+        if connection.vendor != 'sqlite':
+            return False
+        if connection.alias in cls._installed_aliases:
+            return True
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE]
+            )
+            installed = cursor.fetchone() is not None
+        if installed:
+            cls._installed_aliases.add(connection.alias)
+        return installed
+
+    @staticmethod
+    def match_phrase(column, term):
+        return '%s : "%s"' % (column, term.replace('"', '""'))
+
+    def search(self, queryset, name=None, ingredients=()):
+        matches, conditions, params = [], [], []
+        terms = [('name', (name or '').strip())]
+        terms += [('ingredients', ingredient.strip()) for ingredient in ingredients]
+
+        for column, term in terms:
+            if not term:
+                continue
+            if has_wildcards(term) or len(term) < 3:
+                conditions.append(f"{column} LIKE %s ESCAPE '\\'")
+                params.append(wildcard_to_like(term) if has_wildcards(term) else f'%{escape_like(term)}%')
+            else:
+                matches.append(self.match_phrase(column, term))
+
+        if not matches and not conditions:
+            return queryset
+
+        where, where_params = list(conditions), list(params)
+        if matches:
+            where.insert(0, f'{FTS_TABLE} MATCH %s')
+            where_params.insert(0, ' AND '.join(matches))
+        where_sql = ' AND '.join(where)
+
+        queryset = queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {where_sql}', where_params)
+        )
+        if not matches:
+            return queryset
+
+        # bm25() is lower-is-better, negate it so search_rank sorts like Postgres ts_rank
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        rank = RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} '
+            f'WHERE {where_sql} AND rowid = "{RECIPE_TABLE}"."id"',
+            where_params,
+            output_field=FloatField(),
+        )
+        return queryset.annotate(search_rank=rank).order_by('-search_rank', 'name', 'id')
+
+
+VENDOR_BACKENDS = [PostgresSearchBackend, SQLiteFTSSearchBackend]
+
+
+def get_search_backend(using=None):
+    """
+    Return the search backend instance for the given database alias
+
+    RECIPE_SEARCH_BACKEND (a dotted path) overrides vendor detection.
+    """
+    backend_path = getattr(settings, 'RECIPE_SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+
+    connection = connections[using or router.db_for_read(Recipe)]
+    for backend_class in VENDOR_BACKENDS:
+        if backend_class.is_available(connection):
+            return backend_class()
+    return DatabaseSearchBackend()
+
+
+# Index maintenance ---------------------------------------------------------
+
+POSTGRES_INSTALL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    f"""ALTER TABLE {RECIPE_TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(ingredients, '')), 'B')
+        ) STORED""",
+    f'CREATE INDEX IF NOT EXISTS {RECIPE_TABLE}_search_vector_idx ON {RECIPE_TABLE} USING GIN (search_vector)',
+    f'CREATE INDEX IF NOT EXISTS {RECIPE_TABLE}_name_trgm_idx ON {RECIPE_TABLE} USING GIN (name gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS recipes_ingredient_name_trgm_idx ON recipes_ingredient USING GIN (name gin_trgm_ops)',
+]
+
+POSTGRES_UNINSTALL = [
+    'DROP INDEX IF EXISTS recipes_ingredient_name_trgm_idx',
+    f'DROP INDEX IF EXISTS {RECIPE_TABLE}_name_trgm_idx',
+    f'DROP INDEX IF EXISTS {RECIPE_TABLE}_search_vector_idx',
+    f'ALTER TABLE {RECIPE_TABLE} DROP COLUMN IF EXISTS search_vector',
+]
+
+SQLITE_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {RECIPE_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, ingredients) VALUES (new.id, new.name, new.ingredients);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {RECIPE_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, ingredients)
+        VALUES ('delete', old.id, old.name, old.ingredients);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, ingredients ON {RECIPE_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, ingredients)
+        VALUES ('delete', old.id, old.name, old.ingredients);
+        INSERT INTO {FTS_TABLE}(rowid, name, ingredients) VALUES (new.id, new.name, new.ingredients);
+    END""",
+]
+
+SQLITE_UNINSTALL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+
+def install_search_index(connection):
+    """
+    Create (or repair) the vendor specific search index; safe to run repeatedly
+
+    On SQLite, Django rebuilds tables for most ALTERs, which drops the sync
+    triggers, so this also runs after every migrate and rebuilds the FTS
+    index whenever the triggers had to be recreated.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for statement in POSTGRES_INSTALL:
+                cursor.execute(statement)
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+                [f'{FTS_TABLE}_a_'],
+            )
+            if cursor.fetchone()[0] == len(SQLITE_TRIGGERS):
+                return
+            try:
+                cursor.execute(
+                    f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+                    f"name, ingredients, content='{RECIPE_TABLE}', content_rowid='id', "
+                    "tokenize='trigram case_sensitive 0')"
+                )
+            except Exception:
+                # SQLite built without FTS5 or older than 3.34 (no trigram
+                # tokenizer): searches keep using DatabaseSearchBackend.
+                return
+            for statement in SQLITE_TRIGGERS:
+                cursor.execute(statement)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def uninstall_search_index(connection):
+    statements = {
+        'postgresql': POSTGRES_UNINSTALL,
+        'sqlite': SQLITE_UNINSTALL,
+    }.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def repair_search_index(sender, using, **kwargs):
+    """post_migrate handler: reinstall the index if its migration is applied"""
+    connection = connections[using]
+    if SEARCH_INDEX_MIGRATION in MigrationRecorder(connection).applied_migrations():
+        install_search_index(connection)
@@ -0,0 +1,43 @@
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .detail_cache import detail_cache
+from .images import clear_image_url_cache
+from .models import Recipe
+
+
+@receiver(post_save, sender=Recipe)
+def backfill_loaded_recipe(sender, instance, raw, **kwargs):
+    """
+    Fill in the fields save() derives from the ingredients text for recipes
+    loaded raw from a fixture (loaddata skips Recipe.save)
+    """
+    if not raw or instance.ingredient_list or not instance.ingredients:
+        # A full dump (dumpdata) carries the derived fields and join rows itself
+        return
+    instance.refresh_ingredient_cache()
+    instance.difficulty = instance.calculate_difficulty(instance.ingredient_count)
+    Recipe.objects.filter(pk=instance.pk).update(
+        ingredient_list=instance.ingredient_list,
+        ingredient_count=instance.ingredient_count,
+        difficulty=instance.difficulty,
+    )
+    instance.sync_ingredients()
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_detail_cache(sender, instance, **kwargs):
+    """Bump the recipe's detail cache version so its cached object and page are not reused"""
+    # After commit: bumped earlier, a concurrent request could cache the old row under the new version
+    pk = instance.pk
+    transaction.on_commit(lambda: detail_cache.bump_version(pk))
+
+
+@receiver(setting_changed)
+def reset_image_urls(setting, **kwargs):
+    """Resolved image URLs depend on the storages (tests override them)"""
+    if setting in ('STORAGES', 'STATIC_ROOT', 'STATIC_URL', 'MEDIA_ROOT', 'MEDIA_URL'):
+        clear_image_url_cache()
@@ -0,0 +1,64 @@
+"""
+Storages for recipe images
+
+HashedFileSystemStorage puts a hash of the file content in every name it
+saves (recipes/tiramisu.jpg -> recipes/tiramisu.3f2a9c1b7e4d.jpg), the way
+ManifestStaticFilesStorage names collected static files. A name therefore
+always refers to the same bytes and its URL can be cached forever; saving
+identical content again reuses the existing file.
+
+ManifestStaticFilesStorage is WhiteNoise's compressed manifest storage
+that also drops the resolved image URLs cached by recipes.images whenever
+it loads or writes the manifest (collectstatic).
+"""
+import hashlib
+import os
+import re
+
+from django.core.files.storage import FileSystemStorage
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+from .images import clear_image_url_cache
+
+HASH_LENGTH = 12
+HASHED_NAME_RE = re.compile(rf'\.[0-9a-f]{{{HASH_LENGTH}}}\.[^./]+$')
+
+
+def is_hashed_name(name):
+    """Whether name carries a content hash (and so never changes)"""
+    return bool(HASHED_NAME_RE.search(name))
+
+
+def hashed_name(name, content):
+    """name with the hash of content inserted before the extension"""
+    digest = hashlib.md5(usedforsecurity=False)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    root, ext = os.path.splitext(name)
+    return f'{root}.{digest.hexdigest()[:HASH_LENGTH]}{ext}'
+
+
+class HashedFileSystemStorage(FileSystemStorage):
+    """FileSystemStorage with content-hashed file names"""
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        name = hashed_name(name, content)
+        if self.exists(name):
+            # Same hash, same bytes
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+class ManifestStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """CompressedManifestStaticFilesStorage that keeps recipes.images in step with the manifest"""
+
+    def load_manifest(self):
+        clear_image_url_cache()
+        return super().load_manifest()
+
+    def save_manifest(self):
+        super().save_manifest()
+        clear_image_url_cache()
@@ -2,17 +2,22 @@ from django import template
 
 from widget_tweaks.templatetags.widget_tweaks import add_class
 
+from recipes.context_processors import DEFAULT_FOOTER_CLASSES, HERO_FOOTER_CLASSES, is_hero_request
+from recipes.images import image_url
+from recipes.renditions import RENDITION_FORMATS, srcset
+
 register = template.Library()
 
 @register.simple_tag(takes_context=True)
 def is_hero_page(context):
     """
     Check if the current page is a hero page (home, login, logout).
-    Returns True if the current URL name is one of the hero pages.
+    Uses the flag set by the page_chrome context processor, and only
+    resolves the request itself when the template was rendered without it.
     """
-    request = context['request']
-    hero_pages = ['home', 'login', 'logout']
-    return request.resolver_match.url_name in hero_pages
+    if 'hero_page' in context:
+        return context['hero_page']
+    return is_hero_request(context.get('request'))
 
 @register.simple_tag(takes_context=True)
 def get_nav_classes(context, hero_class, default_class):
@@ -28,9 +33,9 @@ def get_footer_classes(context):
     """
     Return the appropriate footer CSS classes based on whether it's a hero page.
     """
-    if is_hero_page(context):
-        return "fixed right-0 z-50 bottom-0 left-0 bg-alternate_a-800/70 backdrop-blur-sm text-accent-300"
-    return "bg-alternate_a-100 border-t border-gray-200 text-accent-800"
+    if 'footer_classes' in context:
+        return context['footer_classes']
+    return HERO_FOOTER_CLASSES if is_hero_page(context) else DEFAULT_FOOTER_CLASSES
 
 @register.simple_tag
 def search_tip_classes():
@@ -63,18 +68,29 @@ def tailwind_select(field):
 @register.filter
 def media_to_static(image_path):
     """
-    Convert media URL to static URL for recipe images.
-    Extracts filename from media path and returns static path.
-    Example: 'recipes/image.jpg' -> 'images/recipes/image.jpg'
+    URL of a recipe image, shipped (static) or uploaded (media).
+    Example: 'recipes/image.jpg' -> '/static/images/recipes/image.<hash>.jpg'
+    See recipes.images.image_url.
+    """
+    return image_url(image_path)
+
+@register.inclusion_tag('recipes/picture.html')
+def recipe_picture(renditions, src, alt, css_class='', sizes='100vw', loading='lazy'):
+    """
+    Render a <picture> for a recipe image: AVIF/WebP sources and a JPEG srcset
+    from Recipe.image_renditions, with src (the original) as the fallback
+    when there are no renditions or the browser supports none of them.
     """
-    from django.templatetags.static import static
-    if not image_path:
-        return static('images/no_picture.png')
-    # Extract just the filename portion (e.g., 'recipes/image.jpg')
-    path_str = str(image_path)
-    # If it's already a full URL or starts with /, return as is
-    if path_str.startswith('http') or path_str.startswith('/static'):
-        return path_str
-    # Convert media path to static path
-    # 'recipes/image.jpg' -> 'images/recipes/image.jpg'
-    return static(f'images/{path_str}')
\ No newline at end of file
+    sources = [
+        {'type': RENDITION_FORMATS[name][2], 'srcset': srcset(renditions, name)}
+        for name in ('avif', 'webp')
+    ]
+    return {
+        'sources': [source for source in sources if source['srcset']],
+        'jpeg_srcset': srcset(renditions, 'jpeg'),
+        'src': src,
+        'alt': alt,
+        'css_class': css_class,
+        'sizes': sizes,
+        'loading': loading,
+    }
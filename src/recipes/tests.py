@@ -1,22 +1,65 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings, tag
 from django.urls import reverse, resolve
-from django.core.exceptions import ValidationError
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.utils import timezone
 from django.contrib.admin.sites import AdminSite
 from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django import forms
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from PIL import Image
 import tempfile
+import shutil
+import time
+import csv
+import importlib.util
+from unittest import skipIf, skipUnless
 import os
-from .models import Recipe
+from .models import Recipe, RecipeQuerySet, Ingredient, RecipeIngredient, RenditionJob
 from .admin import RecipeAdmin
-from .views import HomeView, RecipeListView, RecipeDetailView, recipe_search, process_wildcard_search
+from .views import (
+    HomeView, RecipeListView, RecipeDetailView, recipe_search, collect_search_results,
+)
 from .forms import RecipeSearchForm
-from .utils import get_chart, get_graph
+from .search import (
+    DatabaseSearchBackend, PostgresSearchBackend, SQLiteFTSSearchBackend, get_search_backend,
+    process_ingredient_search, process_wildcard_search,
+)
+from .utils import (
+    get_chart, get_graph, get_all_charts, get_chart_png, pick_chart_format, render_chart,
+    store_charts, chart_series,
+)
+from .chart_executor import ChartExecutor, to_columns
+from .difficulty import classify_difficulty
+from .analytics import bar_count, fingerprint_summary, pick_bar_mode, pick_bucket_size, summarize_recipes
+import numpy as np
+import resource
+from .chart_cache import ChartCache, chart_cache
+from .chart_store import CHART_RENDERER_VERSION, chart_key, chart_store
+from .checks import check_chart_store_cache, check_detail_cache
+from .detail_cache import FRAGMENT_NAME, detail_cache
+from .renditions import available_formats, generate_renditions, get_storage, srcset
+from .images import image_url
+from .storage import ManifestStaticFilesStorage, is_hashed_name
+from django.contrib.staticfiles import finders
+from .jobs import MAX_ATTEMPTS, claim_jobs, complete_job, process_jobs, requeue_stale
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from unittest import mock
 import pandas as pd
 import matplotlib.pyplot as plt
-from io import BytesIO
+from io import BytesIO, StringIO
 import base64
+from datetime import timedelta
+import json
+import copy
+from django.conf import settings
+from .context_processors import DEFAULT_FOOTER_CLASSES, HERO_FOOTER_CLASSES, is_hero_request
 
 class RecipeModelTest(TestCase):
     def test_recipe_str_method(self):
@@ -326,10 +369,38 @@ class RecipeModelTest(TestCase):
                 os.unlink(recipe.recipe_image.path)
 
 
+class RecipeFixtureTest(TestCase):
+    fixtures = ['recipes']
+
+    def test_fixture_loads(self):
+        """The seed data loads with its timestamps (raw saves skip auto_now)"""
+        self.assertEqual(Recipe.objects.count(), 15)
+        self.assertFalse(Recipe.objects.filter(created_at__isnull=True).exists())
+        self.assertFalse(Recipe.objects.filter(updated_at__isnull=True).exists())
+
+    def test_fixture_backfills_derived_fields(self):
+        """Loaded recipes get their ingredient list, count, difficulty and join rows"""
+        recipe = Recipe.objects.get(name="Pasta Carbonara")
+        self.assertEqual(recipe.ingredient_list, ["Spaghetti", "Eggs", "Pancetta", "Parmesan", "Pepper", "Salt"])
+        self.assertEqual(recipe.ingredient_count, 6)
+        self.assertEqual(recipe.difficulty, recipe.calculate_difficulty())
+        self.assertEqual(
+            list(recipe.recipe_ingredients.values_list('ingredient__name', flat=True)),
+            ["spaghetti", "eggs", "pancetta", "parmesan", "pepper", "salt"],
+        )
+        self.assertFalse(Recipe.objects.filter(ingredient_count=0).exists())
+        self.assertEqual(
+            set(Recipe.objects.filter(normalized_ingredients__name="spaghetti").values_list('name', flat=True)),
+            set(Recipe.objects.filter(ingredients__icontains="spaghetti").values_list('name', flat=True)),
+        )
+
+
 class RecipeViewTest(TestCase):
     def setUp(self):
         """Set up test data"""
         self.client = Client()
+        # Start without pages cached by other tests
+        cache.clear()
         
         # Create test user
         self.user = User.objects.create_user(
@@ -359,6 +430,23 @@ class RecipeViewTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'recipes/home.html')
 
+    def test_home_and_about_pages_are_cached(self):
+        """Test that the home and about pages are served from the page cache per session"""
+        for url in (reverse('recipes:home'), reverse('about')):
+            first = self.client.get(url)
+            self.assertIn('max-age=', first['Cache-Control'])
+            self.assertIn('Cookie', first['Vary'])
+            self.assertTrue(first.templates)
+
+            second = self.client.get(url)
+            self.assertEqual(second.content, first.content)
+            self.assertFalse(second.templates)
+
+        # Logging in changes the session cookie, so the page is rendered again
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('recipes:home'))
+        self.assertContains(response, 'Welcome back to Nomalyze, testuser!')
+
     def test_recipe_list_view(self):
         """Test RecipeListView renders correctly with recipes"""
         self.client.login(username='testuser', password='testpass123')
@@ -426,6 +514,70 @@ class RecipeViewTest(TestCase):
         self.assertEqual(recipes[1], self.recipe2)
 
 
+class RecipeListPaginationTest(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.login(username='testuser', password='testpass123')
+        # 30 recipes with duplicate names, so pages must tie-break on id
+        for i in range(30):
+            Recipe.objects.create(name=f"Recipe {i // 2:02d}", ingredients="Salt", cooking_time=5)
+        self.expected = list(Recipe.objects.order_by('name', 'id'))
+
+    def get_page(self, **params):
+        return self.client.get(reverse('recipes:recipe-list'), params)
+
+    def test_first_page_uses_default_page_size(self):
+        """Test that the first page holds the default number of recipes"""
+        response = self.get_page()
+        self.assertEqual(list(response.context['recipes']), self.expected[:12])
+        self.assertTrue(response.context['is_paginated'])
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+    def test_walk_forward_and_back(self):
+        """Test following next and previous cursors through all pages"""
+        seen = []
+        page = self.get_page(page_size=12).context['page_obj']
+        seen.extend(page)
+        while page.has_next():
+            page = self.get_page(after=page.next_cursor, page_size=12).context['page_obj']
+            seen.extend(page)
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(page), 6)
+
+        page = self.get_page(before=page.previous_cursor, page_size=12).context['page_obj']
+        self.assertEqual(list(page), self.expected[12:24])
+        page = self.get_page(before=page.previous_cursor, page_size=12).context['page_obj']
+        self.assertEqual(list(page), self.expected[:12])
+        self.assertFalse(page.has_previous())
+
+    def test_selectable_page_size(self):
+        """Test that only the offered page sizes are honoured"""
+        self.assertEqual(len(self.get_page(page_size=24).context['recipes']), 24)
+        self.assertEqual(len(self.get_page(page_size=1000).context['recipes']), 12)
+        self.assertEqual(len(self.get_page(page_size='abc').context['recipes']), 12)
+
+    def test_cursor_survives_inserts(self):
+        """Test that cursors stay stable when recipes are added before them"""
+        first = self.get_page().context['page_obj']
+        Recipe.objects.create(name="AAA New Recipe", ingredients="Salt", cooking_time=5)
+        second = self.get_page(after=first.next_cursor).context['page_obj']
+        self.assertEqual(list(second), self.expected[12:24])
+
+    def test_invalid_cursor_is_404(self):
+        """Test that malformed cursors return 404"""
+        self.assertEqual(self.get_page(after='not-a-cursor').status_code, 404)
+
+    def test_pagination_links_rendered(self):
+        """Test that the template links to the next page"""
+        response = self.get_page()
+        self.assertContains(response, f"?after={response.context['page_obj'].next_cursor}&page_size=12")
+
+
 class RecipeURLTest(TestCase):
     def test_home_url(self):
         """Test home URL pattern"""
@@ -467,6 +619,8 @@ class RecipeTemplateTest(TestCase):
     def setUp(self):
         """Set up test data"""
         self.client = Client()
+        # Start without recipes cached by other tests (primary keys are reused)
+        cache.clear()
         
         # Create test user
         self.user = User.objects.create_user(
@@ -1233,4 +1387,1407 @@ class RecipeSearchTemplateTest(TestCase):
         })
         
         self.assertEqual(response.status_code, 200)
-        self.assertContains(response, 'No Recipes Found')
\ No newline at end of file
+        self.assertContains(response, 'No Recipes Found')
+
+
+class IngredientModelTest(TestCase):
+    def test_save_creates_normalized_ingredients(self):
+        """Test that saving a recipe mirrors its ingredients into the join table"""
+        recipe = Recipe.objects.create(
+            name="Bruschetta",
+            ingredients="Bread,  Tomato , Basil, tomato",
+            cooking_time=10
+        )
+
+        names = list(recipe.recipe_ingredients.values_list('ingredient__name', flat=True))
+        self.assertEqual(names, ["bread", "tomato", "basil"])
+        self.assertEqual(Ingredient.objects.count(), 3)
+
+    def test_ingredients_are_shared_between_recipes(self):
+        """Test that recipes reuse existing Ingredient rows"""
+        Recipe.objects.create(name="Salad", ingredients="Tomato, Lettuce", cooking_time=5)
+        Recipe.objects.create(name="Sauce", ingredients="tomato, Garlic", cooking_time=20)
+
+        self.assertEqual(Ingredient.objects.filter(name="tomato").count(), 1)
+        self.assertEqual(Ingredient.objects.get(name="tomato").recipes.count(), 2)
+
+    def test_update_resyncs_ingredients(self):
+        """Test that editing the ingredients text replaces the join rows"""
+        recipe = Recipe.objects.create(name="Soup", ingredients="Water, Salt", cooking_time=30)
+        recipe.ingredients = "Water, Carrot"
+        recipe.save()
+
+        names = list(recipe.recipe_ingredients.values_list('ingredient__name', flat=True))
+        self.assertEqual(names, ["water", "carrot"])
+        self.assertEqual(RecipeIngredient.objects.count(), 2)
+
+    def test_text_field_still_available(self):
+        """Test that the ingredients text keeps working for templates and the split filter"""
+        recipe = Recipe.objects.create(name="Toast", ingredients="Bread, Butter", cooking_time=3)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.ingredients, "Bread, Butter")
+        self.assertEqual(recipe.return_ingredients_as_list(), ["Bread", "Butter"])
+
+    def test_ingredient_count_maintained_on_save(self):
+        """Test that save keeps ingredient_count and ingredient_list in sync with the text"""
+        recipe = Recipe.objects.create(name="Soup", ingredients="Water, Salt,, Pepper ", cooking_time=30)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.ingredient_count, 3)
+        self.assertEqual(recipe.ingredient_list, ["Water", "Salt", "Pepper"])
+
+        recipe.ingredients = "Water"
+        recipe.save()
+        self.assertEqual(Recipe.objects.filter(ingredient_count__lte=1).get(), recipe)
+
+    def test_ingredient_tuple(self):
+        """Test that ingredient_tuple comes from the list split at save time and follows changes"""
+        recipe = Recipe.objects.create(name="Soup", ingredients="Water, Salt,, Pepper ", cooking_time=30)
+        recipe = Recipe.objects.get(pk=recipe.pk)
+        with mock.patch('recipes.models.split_ingredients') as split:
+            self.assertEqual(recipe.ingredient_tuple, ("Water", "Salt", "Pepper"))
+        split.assert_not_called()
+
+        recipe.ingredients = "Water"
+        recipe.save()
+        self.assertEqual(recipe.ingredient_tuple, ("Water",))
+        # Without the stored list the text is split instead
+        self.assertEqual(Recipe.objects.defer('ingredient_list').get(pk=recipe.pk).ingredient_tuple, ("Water",))
+
+    def test_process_ingredient_search(self):
+        """Test ingredient terms filter through the normalized join"""
+        pesto = Recipe.objects.create(name="Pesto", ingredients="Pasta, Basil, Pine nuts", cooking_time=10)
+        pizza = Recipe.objects.create(name="Pizza", ingredients="Dough, Tomato sauce", cooking_time=8)
+
+        self.assertIsNone(process_ingredient_search(""))
+
+        qs = Recipe.objects.filter(process_ingredient_search("TOMATO"))
+        self.assertEqual(list(qs), [pizza])
+
+        qs = Recipe.objects.filter(process_ingredient_search("pine*"))
+        self.assertEqual(list(qs), [pesto])
+
+        qs = Recipe.objects.filter(process_ingredient_search("d?ugh"))
+        self.assertEqual(list(qs), [pizza])
+
+
+class RecipeQuerySetTest(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        self.recipe = Recipe.objects.create(
+            name="Omelette",
+            ingredients="eggs, butter, salt",
+            cooking_time=5,
+            short_description="Quick breakfast",
+            comments="Long comment text"
+        )
+
+    def test_cards_defer_heavy_columns(self):
+        """Test that cards() only loads the card columns"""
+        recipe = Recipe.objects.cards().get()
+        self.assertEqual(recipe.get_deferred_fields(), {
+            'ingredients', 'cooking_time', 'difficulty', 'likes', 'comments', 'references',
+            'ingredient_list', 'ingredient_count', 'created_at', 'updated_at', 'image_renditions_ready'
+        })
+        with self.assertNumQueries(0):
+            self.assertEqual((recipe.name, recipe.short_description), ("Omelette", "Quick breakfast"))
+
+    def test_analytics_rows_are_tuples(self):
+        """Test that analytics_rows() returns plain tuples with optional extra columns"""
+        row = Recipe.objects.analytics_rows('recipe_image').get()
+        self.assertEqual(row[:5], (self.recipe.pk, "Omelette", 5, "Easy", "eggs, butter, salt"))
+        self.assertEqual(row[-1], 'recipes/no_picture.png')
+        self.assertEqual(len(row), len(RecipeQuerySet.ANALYTICS_FIELDS) + 1)
+
+    def test_list_view_uses_cards(self):
+        """Test that the recipe list does not load the ingredients text"""
+        User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('recipes:recipe-list'))
+        self.assertIn('ingredients', response.context['recipes'][0].get_deferred_fields())
+
+
+class SearchPipelineTest(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        for i in range(5):
+            Recipe.objects.create(name=f"Recipe {i}", ingredients="salt, pepper, oil", cooking_time=10 + i)
+
+    def test_single_query(self):
+        """Test that the result cards come from a single SELECT"""
+        with self.assertNumQueries(1):
+            results = collect_search_results(Recipe.objects.order_by('name'))
+        self.assertEqual([recipe['name'] for recipe in results['recipes']], [f"Recipe {i}" for i in range(5)])
+        self.assertEqual([recipe['ingredient_count'] for recipe in results['recipes']], [3] * 5)
+        self.assertEqual([recipe['cooking_time'] for recipe in results['recipes']], [10, 11, 12, 13, 14])
+        self.assertFalse(results['truncated'])
+
+    def test_row_cap(self):
+        """Test that at most max_rows recipes are materialized"""
+        with self.assertNumQueries(1):
+            results = collect_search_results(Recipe.objects.order_by('name'), max_rows=3)
+        self.assertEqual(len(results['recipes']), 3)
+        self.assertTrue(results['truncated'])
+
+    def test_no_results(self):
+        """Test that an empty result set needs no extra exists() query"""
+        with self.assertNumQueries(1):
+            results = collect_search_results(Recipe.objects.filter(name="missing"))
+        self.assertEqual(results['recipes'], [])
+
+    def test_search_view_filters_ingredient_count(self):
+        """Test filtering on the maximum number of ingredients in the database"""
+        Recipe.objects.create(name="Toast", ingredients="bread", cooking_time=3)
+        User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        self.client.post(reverse('recipes:recipe-search'), {'search_action': 'search', 'ingredient_count_max': 2})
+        response = self.client.get(reverse('recipes:recipe-search'))
+        self.assertEqual([recipe['name'] for recipe in response.context['recipes']], ["Toast"])
+        self.assertEqual(response.context['recipes'][0]['ingredient_tuple'], ("bread",))
+
+        response = self.client.post(reverse('recipes:recipe-search'), {'search_action': 'search', 'ingredient_count_max': 'abc'})
+        self.assertEqual(response.status_code, 302)
+        response = self.client.get(reverse('recipes:recipe-search'))
+        self.assertEqual(len(response.context['recipes']), Recipe.objects.count())
+
+    @override_settings(RECIPE_SEARCH_MAX_ROWS=2)
+    def test_search_view_reports_truncation(self):
+        """Test that the search page says when results were capped"""
+        User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        self.client.post(reverse('recipes:recipe-search'), {'search_action': 'show_all'})
+        response = self.client.get(reverse('recipes:recipe-search'))
+        self.assertEqual(len(response.context['recipes']), 2)
+        self.assertContains(response, 'Showing the first 2 of 5 matching recipes')
+
+
+class ImportRecipesCommandTest(TestCase):
+    def write_input(self, suffix, content):
+        handle = tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False, encoding='utf-8')
+        with handle:
+            handle.write(content)
+        self.addCleanup(os.remove, handle.name)
+        return handle.name
+
+    def test_import_csv(self):
+        """Test importing recipes from CSV in several batches"""
+        path = self.write_input('.csv', (
+            "name,ingredients,cooking_time,short_description\n"
+            "Toast,\"Bread, Butter\",3,Breakfast\n"
+            "Stew,\"Beef, Carrot, Onion, Potato\",120,\n"
+            "Omelette,\"Eggs, Butter, Salt, Pepper\",5,\n"
+        ))
+        out = StringIO()
+        call_command('import_recipes', path, batch_size=2, stdout=out)
+
+        self.assertIn('Imported 3 recipes (0 skipped)', out.getvalue())
+        self.assertIn('rows/sec', out.getvalue())
+        difficulties = dict(Recipe.objects.values_list('name', 'difficulty'))
+        self.assertEqual(difficulties, {'Toast': 'Easy', 'Stew': 'Hard', 'Omelette': 'Medium'})
+        toast = Recipe.objects.get(name='Toast')
+        self.assertEqual((toast.ingredient_count, toast.short_description), (2, 'Breakfast'))
+        # Bulk-created recipes are linked to their ingredients like saved ones
+        self.assertEqual(Ingredient.objects.get(name='butter').recipes.count(), 2)
+        self.assertEqual(list(toast.recipe_ingredients.values_list('ingredient__name', flat=True)), ['bread', 'butter'])
+
+    def test_import_jsonl_skips_invalid_rows(self):
+        """Test importing JSON Lines and skipping rows that fail validation"""
+        path = self.write_input('.jsonl', "\n".join([
+            json.dumps({'name': 'Salad', 'ingredients': 'Lettuce, Tomato', 'cooking_time': 10}),
+            json.dumps({'name': '', 'ingredients': 'Water', 'cooking_time': 5}),
+            json.dumps({'name': 'Soup', 'ingredients': 'Water', 'cooking_time': 'long'}),
+            '{"name": "Broken", ',
+            json.dumps(['Stew', 'Beef', 60]),
+            '',
+        ]))
+        out = StringIO()
+        call_command('import_recipes', path, stdout=out)
+
+        self.assertIn('Imported 1 recipes (4 skipped)', out.getvalue())
+        self.assertEqual(Recipe.objects.get().difficulty, 'Intermediate')
+
+    def test_import_jsonl_checks_value_types(self):
+        """Test that non-text values are skipped and ingredient lists are joined"""
+        path = self.write_input('.jsonl', "\n".join([
+            json.dumps({'name': 5, 'ingredients': 'Water', 'cooking_time': 5}),
+            json.dumps({'name': 'Soup', 'ingredients': {'water': 1}, 'cooking_time': 5}),
+            json.dumps({'name': 'Tea', 'ingredients': ['Water', 3], 'cooking_time': 5}),
+            json.dumps({'name': 'Stew', 'ingredients': 'Beef', 'cooking_time': 60, 'recipe_image': 7}),
+            json.dumps({'name': 'Salad', 'ingredients': ['Lettuce', 'Tomato'], 'cooking_time': 10}),
+        ]))
+        out = StringIO()
+        call_command('import_recipes', path, stdout=out)
+
+        self.assertIn('Imported 1 recipes (4 skipped)', out.getvalue())
+        salad = Recipe.objects.get()
+        self.assertEqual((salad.ingredients, salad.ingredient_count), ('Lettuce, Tomato', 2))
+
+    def test_unknown_format(self):
+        """Test that an unknown input format is rejected"""
+        with self.assertRaises(CommandError):
+            call_command('import_recipes', 'recipes.txt')
+
+
+class ExportRecipesTest(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        Recipe.objects.create(name="Toast", ingredients="Bread, Butter", cooking_time=3)
+        Recipe.objects.create(name="Stew, Irish", ingredients="Lamb, Potato", cooking_time=90)
+
+    def test_export_view_csv(self):
+        """Test that the export view streams CSV"""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('recipes:recipe-export', args=['csv']))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('attachment', response['Content-Disposition'])
+
+        rows = list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['name'] for row in rows], ["Toast", "Stew, Irish"])
+        self.assertEqual(rows[0]['difficulty'], 'Easy')
+
+    def test_export_view_jsonl(self):
+        """Test that the export view streams one JSON object per line"""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('recipes:recipe-export', args=['jsonl']))
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['ingredient_count'] for line in lines], [2, 2])
+
+    def test_export_view_requires_login_and_known_format(self):
+        """Test that the export view needs a login and a known format"""
+        response = self.client.get(reverse('recipes:recipe-export', args=['csv']))
+        self.assertEqual(response.status_code, 302)
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('recipes:recipe-export', args=['xml']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_export_command_round_trips_with_import(self):
+        """Test that an exported file can be imported back"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'recipes.jsonl')
+            out = StringIO()
+            call_command('export_recipes', path, chunk_size=1, stdout=out)
+            self.assertIn('Exported 2 recipes', out.getvalue())
+
+            Recipe.objects.all().delete()
+            call_command('import_recipes', path, stdout=StringIO())
+        self.assertEqual(sorted(Recipe.objects.values_list('name', flat=True)), ["Stew, Irish", "Toast"])
+
+    def test_export_command_to_stdout(self):
+        """Test exporting CSV to stdout"""
+        out = StringIO()
+        call_command('export_recipes', '-', format='csv', stdout=out, stderr=StringIO())
+        self.assertEqual(out.getvalue().splitlines()[0].split(',')[:2], ['id', 'name'])
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+
+    @skipUnless(importlib.util.find_spec('pyarrow'), "pyarrow is not installed")
+    def test_export_command_parquet(self):
+        """Test Parquet export with one row group per chunk"""
+        import pyarrow.parquet as pq
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'recipes.parquet')
+            call_command('export_recipes', path, chunk_size=1, stdout=StringIO())
+            parquet = pq.ParquetFile(path)
+            self.assertEqual(parquet.metadata.num_rows, 2)
+            self.assertEqual(parquet.metadata.num_row_groups, 2)
+
+    @skipIf(importlib.util.find_spec('pyarrow'), "pyarrow is installed")
+    def test_export_command_parquet_without_pyarrow(self):
+        """Test that Parquet export explains the missing dependency"""
+        with self.assertRaisesMessage(CommandError, 'pyarrow'):
+            call_command('export_recipes', 'recipes.parquet', stdout=StringIO())
+
+
+class DifficultyTest(TestCase):
+    def test_classify_difficulty_matches_model(self):
+        """Test that the vectorized classification matches calculate_difficulty"""
+        cooking_times = [5, 9, 10, 60, 5, 9, 10, 60]
+        ingredient_counts = [1, 3, 3, 1, 4, 8, 4, 9]
+        labels = classify_difficulty(cooking_times, ingredient_counts)
+        for cooking_time, count, label in zip(cooking_times, ingredient_counts, labels):
+            recipe = Recipe(cooking_time=cooking_time, ingredients=", ".join(["x"] * count))
+            self.assertEqual(recipe.calculate_difficulty(), label)
+        self.assertEqual(list(labels[:4]), ['Easy', 'Easy', 'Intermediate', 'Intermediate'])
+        self.assertEqual(list(labels[4:]), ['Medium', 'Medium', 'Hard', 'Hard'])
+
+    @override_settings(RECIPE_DIFFICULTY_TIME_THRESHOLD=30, RECIPE_DIFFICULTY_INGREDIENT_THRESHOLD=2)
+    def test_thresholds_from_settings(self):
+        """Test that the thresholds come from the settings"""
+        self.assertEqual(list(classify_difficulty([20, 20, 40], [1, 2, 1])), ['Easy', 'Medium', 'Intermediate'])
+        recipe = Recipe.objects.create(name="Rice", ingredients="Rice", cooking_time=20)
+        self.assertEqual(recipe.difficulty, 'Easy')
+
+    def test_recompute_difficulty_command(self):
+        """Test that recompute_difficulty updates only changed rows with one UPDATE per chunk"""
+        quick = Recipe.objects.create(name="Quick", ingredients="a, b", cooking_time=20)
+        slow = Recipe.objects.create(name="Slow", ingredients="a, b", cooking_time=45)
+        self.assertEqual(quick.difficulty, 'Intermediate')
+
+        out = StringIO()
+        with override_settings(RECIPE_DIFFICULTY_TIME_THRESHOLD=30):
+            call_command('recompute_difficulty', chunk_size=1, stdout=out)
+        self.assertIn('Updated 1 recipes', out.getvalue())
+        quick.refresh_from_db()
+        slow.refresh_from_db()
+        self.assertEqual((quick.difficulty, slow.difficulty), ('Easy', 'Intermediate'))
+        self.assertGreater(quick.updated_at, slow.updated_at)
+
+
+class AnalyticsTest(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        Recipe.objects.create(name="Toast", ingredients="Bread, Butter", cooking_time=3)
+        Recipe.objects.create(name="Salad", ingredients="Lettuce, Tomato", cooking_time=12)
+        Recipe.objects.create(name="Stew", ingredients="Beef, Carrot, Onion, Potato", cooking_time=95)
+        Recipe.objects.create(name="Curry", ingredients="Chicken, Rice, Onion, Spices", cooking_time=45)
+
+    def test_summarize_recipes(self):
+        """Test the GROUP BY aggregates behind the search charts"""
+        with self.assertNumQueries(5):
+            summary = summarize_recipes(Recipe.objects.all())
+        self.assertEqual(summary['total'], 4)
+        self.assertEqual(summary['difficulty_counts'], [['Easy', 1], ['Intermediate', 1], ['Hard', 2]])
+        self.assertEqual(summary['cooking_time_histogram'], {
+            'bucket_size': 10,
+            'buckets': [[0, 1], [10, 1], [40, 1], [90, 1]],
+        })
+        self.assertEqual(summary['by_ingredient_count'], [[2, 2, 7.5, None], [4, 2, 70.0, None]])
+        self.assertEqual(summary['bar'], {
+            'mode': 'recipes',
+            'recipes': [['Stew', 95], ['Curry', 45], ['Salad', 12], ['Toast', 3]],
+        })
+
+    def test_summary_of_filtered_search(self):
+        """Test that summaries honour the search filters and ordering"""
+        qs = SQLiteFTSSearchBackend().search(Recipe.objects.all(), ingredients=["onion"])
+        summary = summarize_recipes(qs)
+        self.assertEqual(summary['total'], 2)
+        self.assertEqual(summary['difficulty_counts'], [['Hard', 2]])
+
+    def test_empty_summary(self):
+        """Test summarizing an empty queryset"""
+        with self.assertNumQueries(1):
+            summary = summarize_recipes(Recipe.objects.filter(name="missing"))
+        self.assertEqual(summary['total'], 0)
+        self.assertEqual(summary['by_ingredient_count'], [])
+
+    def test_pick_bucket_size(self):
+        """Test that histograms keep a bounded number of buckets"""
+        self.assertEqual(pick_bucket_size(1, 9), 1)
+        self.assertEqual(pick_bucket_size(1, 100), 10)
+        self.assertEqual(pick_bucket_size(1, 1440), 240)
+
+    def test_charts_from_summary(self):
+        """Test drawing the three charts from a summary"""
+        summary = summarize_recipes(Recipe.objects.all())
+        bar = json.loads(render_chart('#1', summary, 'json'))
+        self.assertEqual(bar['labels'], ['Stew', 'Curry', 'Salad', 'Toast'])
+        self.assertEqual(bar['values'], [95, 45, 12, 3])
+        histogram = json.loads(render_chart('#1', summarize_recipes(Recipe.objects.all(), 'histogram'), 'json'))
+        self.assertEqual(histogram['labels'], ['0-9', '10-19', '40-49', '90-99'])
+        self.assertEqual(histogram['values'], [1, 1, 1, 1])
+        pie = json.loads(render_chart('#2', summary, 'json', color_scheme='brand'))
+        self.assertEqual(pie['labels'], ['Easy', 'Intermediate', 'Hard'])
+        line = json.loads(render_chart('#3', summary, 'json'))
+        self.assertEqual((line['x'], line['y']), ([2, 4], [7.5, 70.0]))
+        self.assertTrue(render_chart('#3', summary, 'png').startswith(b'\x89PNG'))
+        self.assertEqual(to_columns('#1', summary), summary)
+
+        # Unknown chart types are empty and logged, not printed
+        with mock.patch('sys.stdout', new_callable=StringIO) as stdout, self.assertLogs('recipes.utils', 'WARNING'):
+            self.assertIsNone(json.loads(render_chart('#9', summary, 'json'))['kind'])
+            self.assertIsNone(json.loads(render_chart('#9', pd.DataFrame({'name': ['Toast']}), 'json'))['kind'])
+        self.assertEqual(stdout.getvalue(), '')
+
+    @override_settings(RECIPE_CHART_MAX_BARS=2, RECIPE_CHART_EXTREMES_MAX=3, RECIPE_CHART_TOP_N=1)
+    def test_bar_mode_follows_result_size(self):
+        """Test that bigger results switch to slowest/quickest and then histogram bars"""
+        self.assertEqual(pick_bar_mode(2), 'recipes')
+        self.assertEqual(pick_bar_mode(3), 'extremes')
+        self.assertEqual(pick_bar_mode(4), 'histogram')
+
+        summary = summarize_recipes(Recipe.objects.exclude(name="Curry"))
+        self.assertEqual(summary['bar'], {'mode': 'extremes', 'slowest': [['Stew', 95]], 'quickest': [['Toast', 3]]})
+        self.assertEqual(bar_count(summary), 2)
+        series = json.loads(render_chart('#1', summary, 'json'))
+        self.assertEqual(series['title'], "Slowest and Quickest Recipes")
+        self.assertEqual(series['labels'], ['Stew', 'Toast'])
+
+        summary = summarize_recipes(Recipe.objects.all())
+        self.assertEqual(summary['bar'], {'mode': 'histogram'})
+        self.assertEqual(bar_count(summary), 4)
+
+    def test_dataframe_bar_modes(self):
+        """Test the bar chart modes on per-recipe DataFrames"""
+        data = pd.DataFrame({
+            'name': [f"Recipe {i}" for i in range(300)],
+            'cooking_time': [1 + i % 120 for i in range(300)],
+        })
+        self.assertEqual(len(chart_series('#1', data)['labels']), 300)
+
+        extremes = chart_series('#1', data, bar_mode='extremes', top_n=3)
+        self.assertEqual(extremes['values'], [120, 120, 119, 1, 1, 1])
+
+        histogram = chart_series('#1', data, bar_mode='auto')
+        self.assertEqual(histogram['title'], "Cooking Time Distribution")
+        self.assertLessEqual(len(histogram['labels']), 12)
+        self.assertEqual(sum(histogram['values']), 300)
+
+        # A search without results draws an empty histogram
+        empty = chart_series('#1', data.iloc[:0], bar_mode='histogram')
+        self.assertEqual((empty['labels'], empty['values']), ([], []))
+
+    def test_fingerprint_summary(self):
+        """Test that equal summaries share a fingerprint"""
+        first = fingerprint_summary(summarize_recipes(Recipe.objects.all()))
+        self.assertEqual(first, fingerprint_summary(summarize_recipes(Recipe.objects.order_by('-name'))))
+        Recipe.objects.create(name="Tea", ingredients="Tea", cooking_time=4)
+        self.assertNotEqual(first, fingerprint_summary(summarize_recipes(Recipe.objects.all())))
+
+
+class SearchBackendTest(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        self.pesto = Recipe.objects.create(
+            name="Pasta al Pesto",
+            ingredients="Pasta, Basil, Pine nuts, Parmesan",
+            cooking_time=10
+        )
+        self.carbonara = Recipe.objects.create(
+            name="Pasta alla Carbonara",
+            ingredients="Spaghetti, Eggs, Pecorino, Guanciale",
+            cooking_time=15
+        )
+        self.pizza = Recipe.objects.create(
+            name="Pizza Margherita",
+            ingredients="Dough, Tomato sauce, Mozzarella, Basil",
+            cooking_time=8
+        )
+
+    def search(self, **kwargs):
+        return list(get_search_backend().search(Recipe.objects.all(), **kwargs))
+
+    def test_sqlite_uses_fts_backend(self):
+        """Test that the SQLite test database gets the FTS5 backend"""
+        self.assertIsInstance(get_search_backend(), SQLiteFTSSearchBackend)
+
+    def test_name_substring_search(self):
+        """Test that plain name terms keep substring semantics"""
+        self.assertEqual(self.search(name="pasta"), [self.pesto, self.carbonara])
+        self.assertEqual(self.search(name="esto"), [self.pesto])
+        self.assertEqual(self.search(name="ar"), [self.carbonara, self.pizza])
+
+    def test_name_wildcard_search(self):
+        """Test * and ? wildcards on the name"""
+        self.assertEqual(self.search(name="piz*rita"), [self.pizza])
+        self.assertEqual(self.search(name="pasta al?a"), [self.carbonara])
+
+    def test_ingredient_search(self):
+        """Test that all ingredient terms must match"""
+        self.assertEqual(self.search(ingredients=["basil"]), [self.pesto, self.pizza])
+        self.assertEqual(self.search(ingredients=["basil", "tomato"]), [self.pizza])
+        self.assertEqual(self.search(ingredients=["pine*"]), [self.pesto])
+        self.assertEqual(self.search(name="pasta", ingredients=["basil"]), [self.pesto])
+
+    def test_like_wildcards_are_literal(self):
+        """Test that % and _ in search terms are not LIKE wildcards"""
+        self.assertEqual(self.search(name="%"), [])
+        self.assertEqual(self.search(name="a_"), [])
+        self.assertEqual(self.search(name="p_z*"), [])
+        rye = Recipe.objects.create(name="100% Rye_Bread", ingredients="Rye", cooking_time=60)
+        self.assertEqual(self.search(name="0%"), [rye])
+        self.assertEqual(self.search(name="e_b*"), [rye])
+
+    def test_results_are_ranked(self):
+        """Test that ranked results carry a search_rank annotation"""
+        results = self.search(name="pasta")
+        self.assertTrue(all(hasattr(recipe, 'search_rank') for recipe in results))
+
+    def test_index_follows_updates_and_deletes(self):
+        """Test that the triggers keep the FTS index in sync"""
+        self.pizza.name = "Pizza Marinara"
+        self.pizza.save()
+        self.assertEqual(self.search(name="marinara"), [self.pizza])
+        self.assertEqual(self.search(name="margherita"), [])
+
+        self.pizza.delete()
+        self.assertEqual(self.search(name="pizza"), [])
+
+    def test_postgres_backend_keeps_substring_semantics(self):
+        """Test the PostgreSQL name filter (portable part) and that punctuation-only terms match nothing"""
+        backend = PostgresSearchBackend()
+        self.assertEqual(list(backend.filter_name(Recipe.objects.order_by('id'), "arbon")), [self.carbonara])
+        self.assertEqual(list(backend.filter_name(Recipe.objects.order_by('id'), "pasta al (")), [])
+        with self.assertNumQueries(0):
+            self.assertEqual(list(backend.search(Recipe.objects.all(), name="!!!")), [])
+            self.assertEqual(list(backend.search(Recipe.objects.all(), ingredients=["basil", "--"])), [])
+
+    @override_settings(RECIPE_SEARCH_BACKEND='recipes.search.DatabaseSearchBackend')
+    def test_database_backend_setting(self):
+        """Test that RECIPE_SEARCH_BACKEND forces the portable backend"""
+        self.assertIsInstance(get_search_backend(), DatabaseSearchBackend)
+        self.assertEqual(sorted(r.pk for r in self.search(name="pasta*", ingredients=["basil"])), [self.pesto.pk])
+
+
+class ChartCacheTest(TestCase):
+    def setUp(self):
+        chart_cache.clear()
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first"""
+        cache = ChartCache(max_entries=2, timeout=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_ttl_expiry(self):
+        """Test that entries expire after the timeout"""
+        now = [100.0]
+        cache = ChartCache(max_entries=10, timeout=5, clock=lambda: now[0])
+        cache.set('a', 1)
+        now[0] += 4
+        self.assertEqual(cache.get('a'), 1)
+        now[0] += 2
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+    def test_recipe_changes_keep_cache(self):
+        """Test that saving or deleting a recipe leaves content-addressed charts cached"""
+        chart_cache.set('key', 'chart')
+        recipe = Recipe.objects.create(name="Soup", ingredients="Water", cooking_time=20)
+        recipe.delete()
+        self.assertEqual(chart_cache.get('key'), 'chart')
+
+
+class ChartEndpointTest(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        chart_cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        Recipe.objects.create(name="Pasta al Pesto", ingredients="pasta, pesto", cooking_time=10)
+        Recipe.objects.create(name="Pizza Margherita", ingredients="dough, tomato", cooking_time=5)
+
+    def test_session_only_holds_search_key(self):
+        """Test that search results and charts stay out of the session"""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.post(reverse('recipes:recipe-search'), {'search_action': 'show_all'})
+        self.assertRedirects(response, reverse('recipes:recipe-search') + '#search-results',
+                             fetch_redirect_response=False)
+
+        session = self.client.session
+        self.assertIn('search_key', session)
+        self.assertNotIn('search_recipes', session)
+        self.assertNotIn('search_charts', session)
+
+        response = self.client.get(reverse('recipes:recipe-search'))
+        self.assertEqual(len(response.context['recipes']), 2)
+        for url in response.context['charts'].values():
+            self.assertContains(response, url)
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertNotIn('search_key', self.client.session)
+
+    def test_chart_image_response(self):
+        """Test that stored charts are served as cacheable PNGs"""
+        key = chart_key('#1', 'brand', 'fingerprint')
+        chart_store.save_chart(key, b'\x89PNG data')
+
+        response = self.client.get(reverse('recipes:chart-image', args=[key, 'png']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response.content, b'\x89PNG data')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('public', response['Cache-Control'])
+
+        response = self.client.get(
+            reverse('recipes:chart-image', args=[key, 'png']), HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_chart_keys_carry_renderer_version(self):
+        """Test that a new renderer version gives every chart a new key"""
+        key = chart_key('#1', 'brand', 'fingerprint')
+        with mock.patch('recipes.chart_store.CHART_RENDERER_VERSION', CHART_RENDERER_VERSION + 1):
+            self.assertNotEqual(chart_key('#1', 'brand', 'fingerprint'), key)
+
+    def test_chart_image_survives_local_cache_clear(self):
+        """Test that charts are read back from the shared store"""
+        key = chart_key('#2', 'brand', 'fingerprint')
+        chart_store.save_chart(key, b'png')
+        chart_cache.clear()
+        self.assertEqual(self.client.get(reverse('recipes:chart-image', args=[key, 'png'])).content, b'png')
+
+    def test_unknown_chart_is_404(self):
+        """Test that missing charts return 404"""
+        response = self.client.get(reverse('recipes:chart-image', args=['missing', 'png']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_chart_formats(self):
+        """Test that charts are served with the content type of their format"""
+        key = chart_key('#1', 'brand', 'fingerprint', 'svg')
+        chart_store.save_chart(key, b'<svg></svg>', 'svg')
+
+        response = self.client.get(reverse('recipes:chart-image', args=[key, 'svg']))
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        response = self.client.get(reverse('recipes:chart-image', args=[key, 'gif']))
+        self.assertEqual(response.status_code, 404)
+        # Only served in the format it was stored in
+        response = self.client.get(reverse('recipes:chart-image', args=[key, 'png']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_json_charts_are_served(self):
+        """Test that JSON charts are stored by store_charts and served as JSON"""
+        data = pd.DataFrame({'name': ['Toast'], 'cooking_time': [3], 'difficulty': ['Easy'], 'ingredient_count': [2]})
+        charts = store_charts(data, 'fingerprint', 'brand', {'bar': 'json', 'pie': 'json', 'line': 'json'})
+        response = self.client.get(reverse('recipes:chart-image', args=charts['bar']))
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(response.content)['labels'], ['Toast'])
+
+    def test_chart_store_must_be_shared_between_workers(self):
+        """Test that a local-memory chart store is refused when several workers serve requests"""
+        self.assertEqual(check_chart_store_cache(None), [])
+        with self.settings(WEB_CONCURRENCY=4):
+            self.assertEqual([error.id for error in check_chart_store_cache(None)], ['recipes.E001'])
+            with self.assertRaises(ImproperlyConfigured):
+                chart_store.save_search({'recipes': []})
+        file_cache = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': tempfile.mkdtemp()}
+        self.addCleanup(shutil.rmtree, file_cache['LOCATION'], ignore_errors=True)
+        with self.settings(WEB_CONCURRENCY=4, CACHES={'default': file_cache}):
+            self.assertEqual(check_chart_store_cache(None), [])
+
+    def test_pick_chart_format(self):
+        """Test that SVG is preferred except for large bar charts"""
+        self.assertEqual(pick_chart_format('pie', 1000), 'svg')
+        self.assertEqual(pick_chart_format('bar', 10), 'svg')
+        self.assertEqual(pick_chart_format('bar', 1000), 'png')
+        with self.settings(RECIPE_CHART_FORMAT='png'):
+            self.assertEqual(pick_chart_format('line', 10), 'png')
+        # The search page puts charts in <img> tags
+        with self.settings(RECIPE_CHART_FORMAT='json'), self.assertRaises(ImproperlyConfigured):
+            pick_chart_format('line', 10)
+
+
+class ChartExecutorTest(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        self.test_data = pd.DataFrame({
+            'id': [1, 2, 3],
+            'name': ['Recipe 1', 'Recipe 2', 'Recipe 3'],
+            'cooking_time': [10, 15, 20],
+            'difficulty': ['Easy', 'Medium', 'Hard'],
+            'ingredients': ['a, b', 'a, b, c', 'a'],
+            'ingredient_count': [2, 3, 1]
+        })
+        self.jobs = [(chart_type, self.test_data, {'color_scheme': 'brand'}) for chart_type in ('#1', '#2', '#3')]
+
+    def test_to_columns_sends_only_needed_columns(self):
+        """Test that workers receive compact column arrays"""
+        columns = to_columns('#3', self.test_data)
+        self.assertEqual(set(columns), {'ingredient_count', 'cooking_time'})
+        self.assertIsInstance(columns['cooking_time'], np.ndarray)
+        self.assertEqual(to_columns('#2', self.test_data), {'difficulty': ['Easy', 'Medium', 'Hard']})
+
+    def test_inline_render(self):
+        """Test rendering in the calling thread when no pool is configured"""
+        pngs = ChartExecutor(max_workers=0).render(self.jobs)
+        self.assertEqual(len(pngs), 3)
+        self.assertTrue(all(png.startswith(b'\x89PNG') for png in pngs))
+
+        # A failing chart is None, as in the pool, and the others still render
+        jobs = [self.jobs[0], ('#1', self.test_data, {'output_format': 'gif'})]
+        with self.assertLogs('recipes.chart_executor', 'ERROR'):
+            pngs = ChartExecutor(max_workers=0).render(jobs)
+        self.assertTrue(pngs[0].startswith(b'\x89PNG'))
+        self.assertIsNone(pngs[1])
+
+    def test_process_pool_render(self):
+        """Test rendering all charts concurrently in worker processes"""
+        executor = ChartExecutor(max_workers=3, timeout=60)
+        try:
+            pngs = executor.render(self.jobs)
+        finally:
+            executor.shutdown()
+        self.assertEqual(len(pngs), 3)
+        self.assertTrue(all(png.startswith(b'\x89PNG') for png in pngs))
+
+    def test_start_spawns_workers_up_front(self):
+        """Test that start() brings up every worker before the first batch"""
+        executor = ChartExecutor(max_workers=2, timeout=60)
+        try:
+            executor.start()
+            # Each worker reports its pid from the initializer, before any batch is submitted
+            pids = set()
+            deadline = time.monotonic() + 60
+            while len(pids) < 2 and time.monotonic() < deadline:
+                if executor._worker_pids.empty():
+                    time.sleep(0.05)
+                else:
+                    pids.add(executor._worker_pids.get())
+            self.assertEqual(len(pids), 2)
+        finally:
+            executor.shutdown()
+
+    def test_reset_pool_stops_its_workers(self):
+        """Test that a reset pool's workers, known by the pids they report, are terminated"""
+        executor = ChartExecutor(max_workers=2, timeout=60)
+        try:
+            executor.render(self.jobs)
+            with mock.patch('recipes.chart_executor.os.kill', wraps=os.kill) as kill:
+                executor._reset_pool()
+            self.assertGreaterEqual(kill.call_count, 1)
+            # The next batch gets a fresh pool
+            self.assertTrue(all(png.startswith(b'\x89PNG') for png in executor.render(self.jobs)))
+        finally:
+            executor.shutdown()
+
+    def test_render_timeout_returns_none(self):
+        """Test that charts exceeding the timeout are dropped instead of blocking"""
+        executor = ChartExecutor(max_workers=2, timeout=0.001)
+        try:
+            with self.assertLogs('recipes.chart_executor', 'WARNING'):
+                pngs = executor.render(self.jobs)
+        finally:
+            executor.shutdown()
+        self.assertIn(None, pngs)
+
+    def test_get_all_charts(self):
+        """Test that get_all_charts returns the three base64 charts"""
+        charts = get_all_charts(self.test_data, color_scheme='brand')
+        self.assertEqual(set(charts), {'bar', 'pie', 'line'})
+        for chart in charts.values():
+            self.assertTrue(base64.b64decode(chart).startswith(b'\x89PNG'))
+
+    def test_render_chart_formats(self):
+        """Test rendering charts as SVG and as JSON series"""
+        svg = render_chart('#2', self.test_data, 'svg', color_scheme='brand')
+        self.assertIn(b'<svg', svg)
+
+        series = json.loads(render_chart('#1', self.test_data, 'json'))
+        self.assertEqual(series['kind'], 'bar')
+        self.assertEqual(series['labels'], ['Recipe 1', 'Recipe 2', 'Recipe 3'])
+        self.assertEqual(series['values'], [10, 15, 20])
+        self.assertEqual(json.loads(get_chart('#3', self.test_data, 'json'))['x'], [2, 3, 1])
+
+        with self.assertRaises(ValueError):
+            render_chart('#1', self.test_data, 'gif')
+
+    def test_store_charts_in_requested_formats(self):
+        """Test that store_charts keys charts by format"""
+        charts = store_charts(self.test_data, 'fingerprint', 'brand', {'bar': 'png', 'pie': 'svg', 'line': 'json'})
+        self.assertEqual({name: chart[1] for name, chart in charts.items()}, {'bar': 'png', 'pie': 'svg', 'line': 'json'})
+        self.assertTrue(chart_store.get_chart(charts['bar'][0]).startswith(b'\x89PNG'))
+        self.assertIn(b'<svg', chart_store.get_chart(charts['pie'][0]))
+
+
+def current_rss_kb():
+    """Resident set size of this process in KB (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class ChartMemoryTest(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        self.test_data = pd.DataFrame({
+            'name': ['Recipe 1', 'Recipe 2', 'Recipe 3'],
+            'cooking_time': [10, 15, 20],
+            'difficulty': ['Easy', 'Medium', 'Hard'],
+            'ingredient_count': [3, 5, 7]
+        })
+
+    def test_charts_do_not_use_pyplot_figures(self):
+        """Test that rendering charts leaves pyplot's figure registry untouched"""
+        before = plt.get_fignums()
+        for chart_type in ('#1', '#2', '#3'):
+            get_chart(chart_type, self.test_data)
+        self.assertEqual(plt.get_fignums(), before)
+
+    def test_legacy_get_graph_closes_pyplot_figure(self):
+        """Test that get_graph closes the pyplot figure it rendered"""
+        plt.figure()
+        plt.plot([1, 2, 3], [1, 4, 2])
+        get_graph()
+        self.assertEqual(plt.get_fignums(), [])
+
+    @tag('slow')
+    def test_rss_bounded_over_1000_charts(self):
+        """Test that rendering 1,000 charts does not grow memory unboundedly"""
+        chart_types = ('#1', '#2', '#3')
+        # Warm up fonts, caches and the reusable figures first
+        for i in range(30):
+            get_chart_png(chart_types[i % 3], self.test_data)
+        baseline = current_rss_kb()
+
+        for i in range(1000):
+            get_chart_png(chart_types[i % 3], self.test_data)
+
+        growth_mb = (current_rss_kb() - baseline) / 1024
+        self.assertLess(growth_mb, 20, f"RSS grew by {growth_mb:.1f} MB over 1,000 charts")
+
+
+class RecipeDetailCacheTestMixin:
+    """Detail cache tests, run against each cache backend by the subclasses"""
+
+    def cache_settings(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        """Set up test data"""
+        settings_override = override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}, 'details': self.cache_settings()},
+            RECIPE_DETAIL_CACHE='details',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.recipe = Recipe.objects.create(
+            name="Cached Recipe",
+            ingredients="Flour, Water",
+            cooking_time=20,
+            short_description="A cached recipe"
+        )
+        self.addCleanup(detail_cache.cache.clear)
+
+    def test_cached_recipe_needs_no_query(self):
+        """Test that a recipe read once is then served without a database query"""
+        with self.assertNumQueries(1):
+            detail_cache.get_recipe(self.recipe.pk)
+        with self.assertNumQueries(0):
+            recipe, _ = detail_cache.get_recipe(self.recipe.pk)
+        self.assertEqual(recipe.name, "Cached Recipe")
+
+    def test_save_invalidates(self):
+        """Test that saving a recipe bumps its version"""
+        _, version = detail_cache.get_recipe(self.recipe.pk)
+        self.recipe.name = "Renamed Recipe"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.save()
+            # Not before commit, or a concurrent read could cache the old row under the new version
+            self.assertEqual(detail_cache.get_version(self.recipe.pk), version)
+
+        recipe, new_version = detail_cache.get_recipe(self.recipe.pk)
+        self.assertNotEqual(new_version, version)
+        self.assertEqual(recipe.name, "Renamed Recipe")
+
+    def test_delete_invalidates(self):
+        """Test that a deleted recipe is no longer served from the cache"""
+        pk = self.recipe.pk
+        detail_cache.get_recipe(pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.delete()
+        with self.assertRaises(Recipe.DoesNotExist):
+            detail_cache.get_recipe(pk)
+
+    def test_bump_all_invalidates_every_recipe(self):
+        """Test that bulk updates are picked up after bump_all"""
+        detail_cache.get_recipe(self.recipe.pk)
+        Recipe.objects.filter(pk=self.recipe.pk).update(cooking_time=99)
+        self.assertEqual(detail_cache.get_recipe(self.recipe.pk)[0].cooking_time, 20)
+
+        detail_cache.bump_all()
+        self.assertEqual(detail_cache.get_recipe(self.recipe.pk)[0].cooking_time, 99)
+
+    def test_detail_view_uses_cache(self):
+        """Test that the detail view reads the recipe and its rendered body from the cache"""
+        self.client.login(username='testuser', password='testpass123')
+        url = reverse('recipes:recipe-detail', args=[self.recipe.pk])
+        first = self.client.get(url)
+        self.assertContains(first, "Cached Recipe")
+        fragment_key = make_template_fragment_key(FRAGMENT_NAME, [self.recipe.pk, first.context['detail_version']])
+        self.assertIn("Cached Recipe", detail_cache.cache.get(fragment_key))
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(url)
+        self.assertEqual(second.content, first.content)
+        self.assertFalse([q for q in queries if 'recipes_recipe' in q['sql']])
+
+    def test_detail_view_shows_saved_changes(self):
+        """Test that the detail page is re-rendered after the recipe is saved"""
+        self.client.login(username='testuser', password='testpass123')
+        url = reverse('recipes:recipe-detail', args=[self.recipe.pk])
+        self.client.get(url)
+        self.recipe.name = "Renamed Recipe"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.save()
+        self.assertContains(self.client.get(url), "Renamed Recipe")
+
+    def test_detail_view_missing_recipe(self):
+        """Test that an unknown recipe is still a 404"""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('recipes:recipe-detail', args=[9999]))
+        self.assertEqual(response.status_code, 404)
+
+
+class LocMemRecipeDetailCacheTest(RecipeDetailCacheTestMixin, TestCase):
+    def cache_settings(self):
+        return {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'recipe-details'}
+
+    def test_detail_cache_must_be_shared_between_workers(self):
+        """Test that a local-memory detail cache is refused when several workers serve requests"""
+        self.assertEqual(check_detail_cache(None), [])
+        with self.settings(WEB_CONCURRENCY=4):
+            self.assertEqual([error.id for error in check_detail_cache(None)], ['recipes.E002'])
+
+
+class FileRecipeDetailCacheTest(RecipeDetailCacheTestMixin, TestCase):
+    def cache_settings(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        return {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+
+    def test_detail_cache_may_serve_several_workers(self):
+        """Test that a file based detail cache passes the shared cache check"""
+        with self.settings(WEB_CONCURRENCY=4):
+            self.assertEqual(check_detail_cache(None), [])
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.other_user = User.objects.create_user(username='otheruser', password='testpass123')
+        self.recipe = Recipe.objects.create(
+            name="Conditional Recipe",
+            ingredients="Flour, Water",
+            cooking_time=20,
+        )
+        self.client.login(username='testuser', password='testpass123')
+        self.list_url = reverse('recipes:recipe-list')
+        self.detail_url = reverse('recipes:recipe-detail', args=[self.recipe.pk])
+
+    def test_created_at_set_once(self):
+        """Test that created_at is set on create and kept on later saves"""
+        created_at = self.recipe.created_at
+        self.assertIsNotNone(created_at)
+        self.recipe.name = "Renamed Recipe"
+        self.recipe.save()
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.created_at, created_at)
+        self.assertGreaterEqual(self.recipe.updated_at, created_at)
+
+    def test_list_not_modified(self):
+        """Test that the list answers 304 to a matching If-None-Match without rendering"""
+        response = self.client.get(self.list_url)
+        self.assertIn('ETag', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(response.templates)
+
+    def test_list_etag_changes_with_recipes(self):
+        """Test that creating, saving and deleting recipes change the list ETag"""
+        etags = [self.client.get(self.list_url)['ETag']]
+        other = Recipe.objects.create(name="Other Recipe", ingredients="Salt", cooking_time=5)
+        etags.append(self.client.get(self.list_url)['ETag'])
+        self.recipe.cooking_time = 25
+        self.recipe.save()
+        etags.append(self.client.get(self.list_url)['ETag'])
+        other.delete()
+        etags.append(self.client.get(self.list_url)['ETag'])
+        self.assertEqual(len(set(etags)), 4)
+
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etags[0])
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_user(self):
+        """Test that another user does not get a 304 for a page showing someone else's name"""
+        etag = self.client.get(self.list_url)['ETag']
+        self.client.login(username='otheruser', password='testpass123')
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_detail_not_modified(self):
+        """Test that the detail page is revalidated by ETag and by Last-Modified"""
+        first = self.client.get(self.detail_url)
+        self.assertIn('ETag', first)
+        self.assertIn('Last-Modified', first)
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_modified_after_save(self):
+        """Test that saving the recipe invalidates the detail page ETag"""
+        etag = self.client.get(self.detail_url)['ETag']
+        self.recipe.name = "Renamed Recipe"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.save()
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, "Renamed Recipe")
+
+    def test_anonymous_still_redirected(self):
+        """Test that validators do not answer 304 before the login check"""
+        self.client.logout()
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn('ETag', response)
+
+
+class ImageRenditionsTest(TestCase):
+    def setUp(self):
+        """Set up a throwaway media root"""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root, RECIPE_RENDITION_WIDTHS=(320, 640, 1280))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def upload(self, width, name='dish.jpg'):
+        buffer = BytesIO()
+        Image.new('RGB', (width, width // 2), color='orange').save(buffer, 'JPEG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+    def create_recipe(self, image):
+        """Create a recipe and run the rendition job its save queued"""
+        recipe = Recipe.objects.create(name="Pictured Recipe", ingredients="Flour", cooking_time=10, recipe_image=image)
+        process_jobs()
+        recipe.refresh_from_db()
+        return recipe
+
+    def test_upload_generates_renditions(self):
+        """Test that an uploaded image gets the narrower widths in every format"""
+        recipe = self.create_recipe(self.upload(800))
+        renditions = recipe.image_renditions
+
+        self.assertTrue(recipe.image_renditions_ready)
+
+        self.assertEqual(renditions['source'], recipe.recipe_image.name)
+        self.assertEqual(set(renditions['formats']), set(available_formats()))
+        storage = get_storage()
+        for format_name, entries in renditions['formats'].items():
+            self.assertEqual([width for width, _ in entries], [320, 640])
+            for width, name in entries:
+                self.assertRegex(name, rf'-{width}\.[0-9a-f]{{12}}\.{format_name}$')
+                with storage.open(name) as rendition:
+                    self.assertEqual(Image.open(rendition).size, (width, width // 2))
+        self.assertEqual(Recipe.objects.get(pk=recipe.pk).image_renditions, renditions)
+
+    def test_renditions_not_regenerated_for_same_image(self):
+        """Test that only a changed image queues new renditions"""
+        recipe = self.create_recipe(self.upload(800))
+        recipe.cooking_time = 20
+        recipe.save()
+        self.assertFalse(RenditionJob.objects.filter(status=RenditionJob.PENDING).exists())
+        self.assertTrue(recipe.image_renditions_ready)
+
+        recipe.recipe_image = self.upload(700, 'other.jpg')
+        recipe.save()
+        job = RenditionJob.objects.get(status=RenditionJob.PENDING)
+        self.assertEqual(job.image_name, recipe.recipe_image.name)
+        # The old image's renditions are dropped straight away
+        self.assertEqual(recipe.image_renditions, {'source': recipe.recipe_image.name, 'formats': {}})
+        self.assertFalse(recipe.image_renditions_ready)
+
+    def test_small_or_missing_images(self):
+        """Test that images narrower than every width, or missing, get no renditions"""
+        recipe = self.create_recipe(self.upload(200))
+        self.assertEqual(recipe.image_renditions, {'source': recipe.recipe_image.name, 'formats': {}})
+        self.assertTrue(recipe.image_renditions_ready)
+        self.assertEqual(generate_renditions('recipes/missing.jpg')['formats'], {})
+        self.assertEqual(srcset(recipe.image_renditions, 'webp'), '')
+
+    def test_srcset(self):
+        """Test the srcset built from stored renditions"""
+        renditions = {'source': 'a.jpg', 'formats': {'webp': [[320, 'renditions/a-320.webp'], [640, 'renditions/a-640.webp']]}}
+        self.assertEqual(srcset(renditions, 'webp'), '/media/renditions/a-320.webp 320w, /media/renditions/a-640.webp 640w')
+        self.assertEqual(srcset(renditions, 'avif'), '')
+
+    def test_list_template_emits_srcset(self):
+        """Test that the recipe cards offer the renditions and keep the original as fallback"""
+        recipe = self.create_recipe(self.upload(800))
+        User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('recipes:recipe-list'))
+
+        self.assertContains(response, '<source type="image/webp" srcset="/media/renditions/')
+        self.assertContains(response, ' 640w"')
+        self.assertContains(response, f'src="/media/{recipe.recipe_image.name}"')
+
+    def test_generate_renditions_command(self):
+        """Test that the command fills in missing renditions once per image"""
+        image = self.create_recipe(self.upload(800)).recipe_image.name
+        Recipe.objects.create(name="Second Recipe", ingredients="Flour", cooking_time=10, recipe_image=image)
+        Recipe.objects.update(image_renditions={}, image_renditions_ready=False)
+
+        out = StringIO()
+        call_command('generate_renditions', stdout=out)
+        self.assertIn('Generated renditions of 1 images for 2 recipes', out.getvalue())
+        self.assertIn('smaller', out.getvalue())
+        self.assertEqual(Recipe.objects.filter(image_renditions__source=image).count(), 2)
+
+        out = StringIO()
+        call_command('generate_renditions', stdout=out)
+        self.assertIn('Generated renditions of 0 images for 0 recipes', out.getvalue())
+
+
+def renditions_or_die(image_name):
+    """generate_renditions that kills its worker process on images called die.jpg"""
+    if image_name.endswith('die.jpg'):
+        os._exit(1)
+    return generate_renditions(image_name)
+
+
+class RenditionJobTest(TestCase):
+    def setUp(self):
+        """Set up a throwaway media root and a recipe with a queued job"""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root, RECIPE_RENDITION_WIDTHS=(320,))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        buffer = BytesIO()
+        Image.new('RGB', (640, 480), color='green').save(buffer, 'JPEG')
+        self.recipe = Recipe.objects.create(
+            name="Queued Recipe", ingredients="Flour", cooking_time=10,
+            recipe_image=SimpleUploadedFile('queued.jpg', buffer.getvalue(), content_type='image/jpeg'),
+        )
+
+    def test_save_queues_instead_of_rendering(self):
+        """Test that saving a new image queues a job and leaves the renditions pending"""
+        with mock.patch('recipes.jobs.generate_renditions') as generate:
+            recipe = Recipe.objects.create(
+                name="Another Recipe", ingredients="Flour", cooking_time=10, recipe_image=self.recipe.recipe_image.name
+            )
+            generate.assert_not_called()
+        self.assertEqual(recipe.rendition_jobs.get().status, RenditionJob.PENDING)
+        self.assertFalse(recipe.image_renditions_ready)
+
+    def test_templates_fall_back_until_ready(self):
+        """Test that the list shows the original image until the job has run"""
+        User.objects.create_user(username='testuser', password='testpass123')
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('recipes:recipe-list'))
+        self.assertNotContains(response, '<source')
+        self.assertNotContains(response, 'srcset=')
+        self.assertContains(response, f'src="/media/{self.recipe.recipe_image.name}"')
+
+        process_jobs()
+        response = self.client.get(reverse('recipes:recipe-list'))
+        self.assertContains(response, 'srcset="/media/renditions/')
+
+    def test_job_completion_is_recorded(self):
+        """Test that a processed job stores the renditions and marks both job and recipe done"""
+        version = detail_cache.get_version(self.recipe.pk)
+        saved_at = self.recipe.updated_at
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(process_jobs(), 1)
+        self.assertNotEqual(detail_cache.get_version(self.recipe.pk), version)
+        job = self.recipe.rendition_jobs.get()
+        self.assertEqual((job.status, job.attempts), (RenditionJob.DONE, 1))
+        self.assertIsNotNone(job.finished_at)
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image_renditions_ready)
+        self.assertEqual(self.recipe.image_renditions['formats']['jpeg'][0][0], 320)
+        # The list ETag (count and latest updated_at) changes with the new markup
+        self.assertGreater(self.recipe.updated_at, saved_at)
+
+    def test_jobs_claimed_once(self):
+        """Test that a claimed job is not handed to a second worker"""
+        self.assertEqual(len(claim_jobs(10)), 1)
+        self.assertEqual(claim_jobs(10), [])
+
+    def test_failed_jobs_retried_then_given_up(self):
+        """Test that a failing job is retried MAX_ATTEMPTS times and then marked failed"""
+        with mock.patch('recipes.jobs.generate_renditions', side_effect=OSError("broken image")):
+            process_jobs()
+        job = self.recipe.rendition_jobs.get()
+        self.assertEqual((job.status, job.attempts, job.error), (RenditionJob.FAILED, MAX_ATTEMPTS, "broken image"))
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image_renditions_ready)
+
+    def test_superseded_job_does_not_overwrite(self):
+        """Test that a job for an image the recipe no longer uses leaves the recipe alone"""
+        job = claim_jobs(1)[0]
+        self.recipe.recipe_image = 'recipes/other.jpg'
+        self.recipe.save()
+        complete_job(job, {'source': job.image_name, 'formats': {'jpeg': [[320, 'x.jpeg']]}})
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_renditions, {'source': 'recipes/other.jpg', 'formats': {}})
+        self.assertFalse(self.recipe.image_renditions_ready)
+
+    def test_stale_jobs_requeued(self):
+        """Test that jobs abandoned by a dead worker go back to the queue"""
+        claim_jobs(1)
+        self.assertEqual(requeue_stale(timedelta(minutes=10)), 0)
+        RenditionJob.objects.update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(timedelta(minutes=10)), 1)
+        self.assertEqual(len(claim_jobs(1)), 1)
+
+    def test_run_workers_command(self):
+        """Test that run_workers --once drains the queue through the process pool"""
+        out = StringIO()
+        call_command('run_workers', processes=1, once=True, stdout=out)
+        self.assertIn('Processed 1 jobs (0 failed)', out.getvalue())
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image_renditions_ready)
+
+    def test_run_workers_survives_dead_worker(self):
+        """Test that run_workers fails the jobs of a dead worker and carries on with a new pool"""
+        doomed = Recipe.objects.create(name="Doomed", ingredients="Flour", cooking_time=10, recipe_image='recipes/die.jpg')
+        out, err = StringIO(), StringIO()
+        with mock.patch('recipes.management.commands.run_workers.generate_renditions', renditions_or_die):
+            call_command('run_workers', processes=1, once=True, stdout=out, stderr=err)
+
+        self.assertIn('restarting the pool', err.getvalue())
+        job = doomed.rendition_jobs.get()
+        self.assertEqual((job.status, job.attempts), (RenditionJob.FAILED, MAX_ATTEMPTS))
+        # The other job was retried in a fresh pool
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image_renditions_ready)
+
+
+class ImageUrlTest(TestCase):
+    def setUp(self):
+        """Set up a throwaway media root"""
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_shipped_uploaded_and_missing_images(self):
+        """Test that shipped images come from static files, uploads from media, the rest get the placeholder"""
+        shipped = 'recipes/tiramisu-inna-safa-BmrXxbVuqTc-unsplash.jpg'
+        self.assertEqual(image_url(shipped), f'/static/images/{shipped}')
+
+        uploaded = default_storage.save('recipes/upload.jpg', ContentFile(b'image bytes'))
+        self.assertEqual(image_url(uploaded), f'/media/{uploaded}')
+
+        self.assertEqual(image_url('recipes/missing.jpg'), '/static/images/no_picture.png')
+        self.assertEqual(image_url(''), '/static/images/no_picture.png')
+        self.assertEqual(image_url('https://example.com/a.jpg'), 'https://example.com/a.jpg')
+
+    def test_manifest_urls_in_production(self):
+        """Test that shipped images resolve to the hashed names of the static files manifest"""
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root, ignore_errors=True)
+        with open(os.path.join(static_root, 'staticfiles.json'), 'w') as manifest:
+            json.dump({'version': '1.1', 'hash': '', 'paths': {
+                'images/recipes/soup.jpg': 'images/recipes/soup.0123456789ab.jpg',
+                'images/no_picture.png': 'images/no_picture.ba9876543210.png',
+            }}, manifest)
+        storages = {
+            'default': {'BACKEND': 'recipes.storage.HashedFileSystemStorage'},
+            'staticfiles': {'BACKEND': 'recipes.storage.ManifestStaticFilesStorage'},
+        }
+        with override_settings(STORAGES=storages, STATIC_ROOT=static_root):
+            self.assertEqual(image_url('recipes/soup.jpg'), '/static/images/recipes/soup.0123456789ab.jpg')
+            self.assertEqual(image_url('recipes/missing.jpg'), '/static/images/no_picture.ba9876543210.png')
+
+    def test_resolved_urls_are_cached(self):
+        """Test that a name is looked up once and the cache is dropped when the manifest is loaded"""
+        shipped = 'recipes/tiramisu-inna-safa-BmrXxbVuqTc-unsplash.jpg'
+        with mock.patch('recipes.images.finders.find', wraps=finders.find) as find:
+            for _ in range(3):
+                image_url(shipped)
+            self.assertEqual(find.call_count, 1)
+
+            ManifestStaticFilesStorage(location=tempfile.gettempdir()).load_manifest()
+            image_url(shipped)
+            self.assertEqual(find.call_count, 2)
+
+    def test_placeholder_fallback_is_not_cached(self):
+        """Test that a missing image is found once the file shows up"""
+        self.assertEqual(image_url('late.jpg'), '/static/images/no_picture.png')
+        with open(os.path.join(self.media_root, 'late.jpg'), 'wb') as late:
+            late.write(b'restored upload')
+        self.assertEqual(image_url('late.jpg'), '/media/late.jpg')
+
+    def test_hashed_storage_names(self):
+        """Test that uploads are named after their content"""
+        first = default_storage.save('recipes/dish.jpg', ContentFile(b'one'))
+        again = default_storage.save('recipes/dish.jpg', ContentFile(b'one'))
+        other = default_storage.save('recipes/dish.jpg', ContentFile(b'two'))
+
+        self.assertRegex(first, r'^recipes/dish\.[0-9a-f]{12}\.jpg$')
+        self.assertEqual(again, first)
+        self.assertNotEqual(other, first)
+        self.assertTrue(is_hashed_name(first))
+        self.assertFalse(is_hashed_name('recipes/dish.jpg'))
+
+    def test_media_view_cache_headers(self):
+        """Test that hashed uploads are served as immutable and unknown files are 404"""
+        name = default_storage.save('recipes/dish.jpg', ContentFile(b'jpeg bytes'))
+        response = self.client.get(f'/media/{name}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'jpeg bytes')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('immutable', response['Cache-Control'])
+
+        with open(os.path.join(self.media_root, 'legacy.jpg'), 'wb') as legacy:
+            legacy.write(b'old upload')
+        self.assertNotIn('Cache-Control', self.client.get('/media/legacy.jpg'))
+        self.assertEqual(self.client.get('/media/recipes/missing.jpg').status_code, 404)
+
+
+class PageChromeTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        Recipe.objects.create(name="Pasta", ingredients="Pasta, Salt", cooking_time=10)
+        templates = copy.deepcopy(settings.TEMPLATES)
+        templates[0]['OPTIONS']['context_processors'].remove('recipes.context_processors.page_chrome')
+        self.without_processor = override_settings(TEMPLATES=templates)
+
+    def render_pages(self):
+        cache.clear()
+        self.client.logout()
+        home = self.client.get(reverse('recipes:home')).content.decode()
+        self.client.login(username='testuser', password='testpass123')
+        recipes = self.client.get(reverse('recipes:recipe-list')).content.decode()
+        return home, recipes
+
+    def test_context_processor_flags_hero_pages(self):
+        """Test that page_chrome sets hero_page and footer_classes once per request"""
+        response = self.client.get(reverse('recipes:home'))
+        self.assertIs(response.context['hero_page'], True)
+        self.assertEqual(response.context['footer_classes'], HERO_FOOTER_CLASSES)
+
+        self.client.login(username='testuser', password='testpass123')
+        with mock.patch('recipes.context_processors.is_hero_request', wraps=is_hero_request) as resolve_hero, \
+                mock.patch('recipes.templatetags.recipe_extras.is_hero_request', wraps=is_hero_request) as tag_resolve:
+            response = self.client.get(reverse('recipes:recipe-list'))
+        self.assertIs(response.context['hero_page'], False)
+        self.assertEqual(response.context['footer_classes'], DEFAULT_FOOTER_CLASSES)
+        # base.html uses the chrome tags nine times, the request is resolved once
+        resolve_hero.assert_called_once()
+        tag_resolve.assert_not_called()
+
+    def test_rendered_chrome_is_unchanged(self):
+        """Test that the chrome tags render the same markup with and without the context processor"""
+        home, recipes = self.render_pages()
+        with self.without_processor:
+            home_fallback, recipes_fallback = self.render_pages()
+
+        self.assertEqual(home, home_fallback)
+        self.assertEqual(recipes, recipes_fallback)
+        self.assertEqual(home.count(HERO_FOOTER_CLASSES), 1)
+        self.assertEqual(recipes.count(DEFAULT_FOOTER_CLASSES), 1)
+        # Five navigation links each, in hero or default colours
+        self.assertEqual(home.count('text-accent-300 hover:text-white'), 5)
+        self.assertEqual(recipes.count('text-accent-600 hover:text-white'), 5)
+        self.assertEqual(recipes.count('text-accent-800 border-l border-alternate_a-300'), 1)
+        self.assertEqual(recipes.count('bg-alternate_a-100 shadow-lg'), 1)
+        self.assertEqual(home.count('bg-alternate_a-800/70 backdrop-blur-sm shadow-lg'), 1)
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import HomeView, RecipeListView, RecipeDetailView, recipe_search
+from .views import HomeView, RecipeListView, RecipeDetailView, recipe_search, chart_image, recipe_export
 
 app_name = 'recipes'
 
@@ -7,5 +7,7 @@ urlpatterns = [
     path('', HomeView.as_view(), name='home'),
     path('recipes/', RecipeListView.as_view(), name='recipe-list'),
     path('recipes/<int:pk>/', RecipeDetailView.as_view(), name='recipe-detail'),
-    path('search/', recipe_search, name='recipe-search')
+    path('search/', recipe_search, name='recipe-search'),
+    path('recipes/charts/<slug:key>.<slug:output_format>', chart_image, name='chart-image'),
+    path('recipes/export.<slug:export_format>', recipe_export, name='recipe-export'),
 ]
\ No newline at end of file
@@ -1,6 +1,81 @@
 from io import BytesIO
 import base64
-import matplotlib.pyplot as plt
+import json
+import logging
+import threading
+import numpy as np
+from matplotlib import rc_context
+from matplotlib.artist import setp
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from .analytics import is_summary, pick_bar_mode, pick_bucket_size
+from .chart_executor import chart_executor
+from .chart_store import chart_key, chart_store
+
+logger = logging.getLogger(__name__)
+
+# Chart names used in templates, mapped to chart types
+CHART_TYPES = {'bar': '#1', 'pie': '#2', 'line': '#3'}
+
+# Supported output formats and their content types
+CHART_FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'json': 'application/json',
+}
+
+# Formats the search page can show in an <img>
+IMAGE_FORMATS = ('png', 'svg')
+
+# Above this many bars an SVG bar chart outweighs the PNG (see benchmarks/chart_formats.py)
+SVG_MAX_BARS = 50
+
+# Figure templates: size and labels for each chart type
+FIGURE_TEMPLATES = {
+    '#1': {
+        'title': "Recipe Cooking Times",
+        'xlabel': "Recipe Name",
+        'ylabel': "Cooking Time (minutes)",
+        'xtick_rotation': 45,
+    },
+    '#2': {
+        'title': "Recipe Difficulty Distribution",
+    },
+    '#3': {
+        'title': "Cooking Time vs Number of Ingredients",
+        'xlabel': "Number of Ingredients",
+        'ylabel': "Cooking Time (minutes)",
+    },
+}
+# Template for bar charts limited to the slowest and quickest recipes
+EXTREMES_TEMPLATE = {
+    'title': "Slowest and Quickest Recipes",
+    'xlabel': "Recipe Name",
+    'ylabel': "Cooking Time (minutes)",
+    'xtick_rotation': 45,
+}
+
+# Templates for charts drawn from a database summary (see recipes.analytics)
+SUMMARY_TEMPLATES = {
+    '#1': {
+        'title': "Cooking Time Distribution",
+        'xlabel': "Cooking Time (minutes)",
+        'ylabel': "Number of Recipes",
+        'xtick_rotation': 45,
+    },
+    '#2': FIGURE_TEMPLATES['#2'],
+    '#3': {
+        'title': "Average Cooking Time by Number of Ingredients",
+        'xlabel': "Number of Ingredients",
+        'ylabel': "Cooking Time (minutes)",
+    },
+}
+FIGURE_SIZE = (8, 5)
+
+# One reusable figure per chart type and thread, cleared after every render
+_figures = threading.local()
 
 # Predefined color schemes
 COLOR_SCHEMES = {
@@ -42,54 +117,145 @@ def get_color_scheme(scheme_name='default'):
     """
     return COLOR_SCHEMES.get(scheme_name, COLOR_SCHEMES['default'])
 
-def get_graph():
-    """Convert matplotlib plot to base64 image for HTML display"""
+def get_graph_png(figure=None):
+    """
+    Render a matplotlib figure to PNG bytes
+
+    Args:
+        figure: matplotlib Figure to render; defaults to pyplot's current
+            figure, which is then closed so it does not leak
+    """
+    close_after = figure is None
+    if figure is None:
+        import matplotlib.pyplot as plt
+        figure = plt.gcf()
     # create a BytesIO buffer for the image
     buffer = BytesIO()
-    # create a plot with a bytesIO object as a file-like object. Set format to png
-    plt.savefig(buffer, format="png")
-    # set cursor to the beginning of the stream
-    buffer.seek(0)
-    # retrieve the content of the file
-    image_png = buffer.getvalue()
-    # encode the bytes-like object
-    graph = base64.b64encode(image_png)
-    # decode to get the string as output
-    graph = graph.decode("utf-8")
-    # free up the memory of buffer
-    buffer.close()
-    # return the image/graph
-    return graph
-
-def get_chart(chart_type, data, **kwargs):
+    try:
+        # create a plot with a bytesIO object as a file-like object. Set format to png
+        figure.savefig(buffer, format="png")
+        # retrieve the content of the file
+        return buffer.getvalue()
+    finally:
+        # free up the memory of buffer
+        buffer.close()
+        if close_after:
+            plt.close(figure)
+
+def get_graph(figure=None):
+    """Convert matplotlib plot to base64 image for HTML display"""
+    # encode the bytes-like object and decode to get the string as output
+    return base64.b64encode(get_graph_png(figure)).decode("utf-8")
+
+def get_figure(chart_type):
+    """
+    Return this thread's reusable figure for chart_type, with its own Agg canvas
+
+    Figures are created without pyplot, so they are never registered in its
+    global figure manager and cannot pile up in long-lived workers.
+    """
+    figures = getattr(_figures, 'by_type', None)
+    if figures is None:
+        figures = _figures.by_type = {}
+    figure = figures.get(chart_type)
+    if figure is None:
+        figure = Figure(figsize=FIGURE_SIZE)
+        FigureCanvasAgg(figure)
+        figures[chart_type] = figure
+    return figure
+
+def apply_figure_template(ax, template):
+    """Apply title, axis labels and tick layout of a figure template (or chart series)"""
+    if 'title' in template:
+        ax.set_title(template['title'])
+    if 'xlabel' in template:
+        ax.set_xlabel(template['xlabel'])
+    if 'ylabel' in template:
+        ax.set_ylabel(template['ylabel'])
+    if 'xtick_rotation' in template:
+        setp(ax.get_xticklabels(), rotation=template['xtick_rotation'], ha='right')
+
+def get_chart(chart_type, data, output_format='png', **kwargs):
     """
     Generate a single chart based on recipe data
     
     Args:
         chart_type: Type of chart ('#1'=bar, '#2'=pie, '#3'=line)
         data: pandas DataFrame with recipe data
+        output_format: 'png' (base64 encoded), 'svg' (markup) or 'json'
+            (chart series for client-side rendering)
         **kwargs: Additional parameters like labels, color_scheme
+
+    Returns:
+        str: the chart in the requested format
     """
-    # switch plot backend to AGG (Anti-Grain Geometry) - to write to file
-    # AGG is preferred solution to write PNG files
-    plt.switch_backend("AGG")
-    # specify figure size
-    fig = plt.figure(figsize=(8, 5))
+    chart = render_chart(chart_type, data, output_format, **kwargs)
+    if output_format == 'png':
+        return base64.b64encode(chart).decode("utf-8")
+    return chart.decode("utf-8")
+
+def get_chart_png(chart_type, data, **kwargs):
+    """
+    Generate a single chart based on recipe data as raw PNG bytes
     
+    Takes the same arguments as get_chart.
+    """
+    return render_chart(chart_type, data, 'png', **kwargs)
+
+def render_chart(chart_type, data, output_format='png', **kwargs):
+    """
+    Render a chart to bytes in one of CHART_FORMATS
+
+    Every format starts from the same chart series (see chart_series); only
+    'png' rasterizes, 'svg' emits vector markup and 'json' skips matplotlib.
+    """
+    try:
+        serializer = CHART_SERIALIZERS[output_format]
+    except KeyError:
+        raise ValueError(f"Unknown chart format: {output_format}")
+    return serializer(chart_series(chart_type, data, **kwargs))
+
+def chart_series(chart_type, data, **kwargs):
+    """
+    Extract the data and colors a chart is drawn from
+
+    Args:
+        chart_type: Type of chart ('#1'=bar, '#2'=pie, '#3'=line)
+        data: pandas DataFrame with recipe data, or a summary from
+            analytics.summarize_recipes (see summary_series)
+        **kwargs: Additional parameters like color_scheme and color overrides;
+            for '#1' with a DataFrame, bar_mode ('recipes', the default,
+            'extremes', 'histogram' or 'auto' to pick by size, see
+            analytics.pick_bar_mode) and top_n
+
+    Returns:
+        dict: JSON serializable series, plus the chart type's figure template
+    """
+    if is_summary(data):
+        return summary_series(chart_type, data, **kwargs)
+
     # Get color scheme
     color_scheme = get_color_scheme(kwargs.get('color_scheme', 'default'))
+    series = {'chart_type': chart_type, 'kind': None}
+    series.update(FIGURE_TEMPLATES.get(chart_type, {}))
     
     # select chart_type based on user input from the form
     if chart_type == "#1":
-        # Bar chart: Recipe names on x-axis, cooking time on y-axis
+        # Bar chart: Recipe names on x-axis, cooking time on y-axis, or (bar_mode)
+        # only the slowest/quickest recipes, or a cooking time histogram
         # Color customization options
         colors = kwargs.get('colors', color_scheme['bar_colors'])
-        
-        plt.bar(data["name"], data["cooking_time"], color=colors[:len(data)])
-        plt.title("Recipe Cooking Times")
-        plt.xlabel("Recipe Name")
-        plt.ylabel("Cooking Time (minutes)")
-        plt.xticks(rotation=45, ha='right')
+        bar_mode = kwargs.get('bar_mode', 'recipes')
+        if bar_mode == 'auto':
+            bar_mode = pick_bar_mode(len(data))
+        if bar_mode == 'extremes':
+            series.update(EXTREMES_TEMPLATE)
+            series.update(extremes_series(*top_recipes(data, kwargs.get('top_n', 10)), colors))
+        elif bar_mode == 'histogram':
+            series.update(SUMMARY_TEMPLATES['#1'])
+            series.update(histogram_series(*numpy_histogram(data["cooking_time"]), colors))
+        else:
+            series.update(bar_series(data["name"], data["cooking_time"], colors))
         
     elif chart_type == "#2":
         # Pie chart: Distribution of difficulty levels
@@ -99,55 +265,210 @@ def get_chart(chart_type, data, **kwargs):
         colors = kwargs.get('colors', None)
         if colors is None:
             colors = [color_scheme['pie_colors'].get(level, '#CCCCCC') for level in difficulty_counts.index]
-        
-        plt.pie(difficulty_counts.values, labels=difficulty_counts.index, autopct='%1.1f%%', colors=colors)
-        plt.title("Recipe Difficulty Distribution")
+        series.update({
+            'kind': 'pie',
+            'labels': [str(level) for level in difficulty_counts.index],
+            'values': [int(count) for count in difficulty_counts.values],
+            'colors': list(colors),
+        })
         
     elif chart_type == "#3":
         # Line chart: Cooking time vs ingredient count
         # Color customization for line chart
-        line_color = kwargs.get('color', color_scheme['line_color'])
-        marker_color = kwargs.get('marker_color', color_scheme['marker_color'])
-        
-        plt.plot(data["ingredient_count"], data["cooking_time"], 
-                marker='o', color=line_color, markerfacecolor=marker_color, 
-                markeredgecolor='white', markeredgewidth=2, linewidth=3)
-        plt.title("Cooking Time vs Number of Ingredients")
-        plt.xlabel("Number of Ingredients")
-        plt.ylabel("Cooking Time (minutes)")
+        series.update({
+            'kind': 'line',
+            'x': [int(value) for value in data["ingredient_count"]],
+            'y': [int(value) for value in data["cooking_time"]],
+            'color': kwargs.get('color', color_scheme['line_color']),
+            'marker_color': kwargs.get('marker_color', color_scheme['marker_color']),
+        })
         
     else:
-        print("unknown chart type")
-    
-    # specify layout details
-    plt.tight_layout()
-    # render the graph to file
-    chart = get_graph()
-    return chart
+        logger.warning("Unknown chart type %r", chart_type)
+
+    return series
+
+def summary_series(chart_type, summary, **kwargs):
+    """
+    Chart series drawn from database aggregates instead of recipe rows
+
+    '#1' is a cooking time histogram, '#2' the difficulty distribution and
+    '#3' the average (and, on PostgreSQL, median) cooking time per number
+    of ingredients.
+    """
+    color_scheme = get_color_scheme(kwargs.get('color_scheme', 'default'))
+    series = {'chart_type': chart_type, 'kind': None}
+    series.update(SUMMARY_TEMPLATES.get(chart_type, {}))
+
+    if chart_type == "#1":
+        bar = summary['bar']
+        colors = kwargs.get('colors', color_scheme['bar_colors'])
+        if bar['mode'] == 'recipes':
+            series.update(FIGURE_TEMPLATES['#1'])
+            series.update(bar_series([name for name, _ in bar['recipes']],
+                                     [time for _, time in bar['recipes']], colors))
+        elif bar['mode'] == 'extremes':
+            series.update(EXTREMES_TEMPLATE)
+            series.update(extremes_series(bar['slowest'], bar['quickest'], colors))
+        else:
+            histogram = summary['cooking_time_histogram']
+            series.update(histogram_series(
+                [start for start, _ in histogram['buckets']],
+                [count for _, count in histogram['buckets']],
+                histogram['bucket_size'], colors,
+            ))
+
+    elif chart_type == "#2":
+        levels = [level for level, _ in summary['difficulty_counts']]
+        colors = kwargs.get('colors', None)
+        if colors is None:
+            colors = [color_scheme['pie_colors'].get(level, '#CCCCCC') for level in levels]
+        series.update({
+            'kind': 'pie',
+            'labels': levels,
+            'values': [count for _, count in summary['difficulty_counts']],
+            'colors': list(colors),
+        })
+
+    elif chart_type == "#3":
+        rows = summary['by_ingredient_count']
+        series.update({
+            'kind': 'line',
+            'x': [ingredient_count for ingredient_count, _, _, _ in rows],
+            'y': [avg for _, _, avg, _ in rows],
+            'color': kwargs.get('color', color_scheme['line_color']),
+            'marker_color': kwargs.get('marker_color', color_scheme['marker_color']),
+        })
+        if rows and rows[0][3] is not None:
+            series['y_median'] = [median for _, _, _, median in rows]
+
+    else:
+        # Drawn as an empty figure, like an unknown chart type in chart_series
+        logger.warning("Unknown chart type %r", chart_type)
+
+    return series
+
+def bar_series(labels, values, colors):
+    """Bar chart series: one bar per label"""
+    labels = [str(label) for label in labels]
+    return {
+        'kind': 'bar',
+        'labels': labels,
+        'values': [int(value) for value in values],
+        'colors': list(colors[:len(labels)]),
+    }
+
+def extremes_series(slowest, quickest, colors):
+    """Bar chart series of the slowest then the quickest recipes, one color per group"""
+    series = bar_series([name for name, _ in slowest + quickest], [time for _, time in slowest + quickest], colors)
+    series['colors'] = [colors[0]] * len(slowest) + [colors[1 % len(colors)]] * len(quickest)
+    return series
+
+def histogram_series(starts, counts, bucket_size, colors):
+    """Bar chart series of a cooking time histogram (bucket start minutes and counts)"""
+    labels = [f"{start}-{start + bucket_size - 1}" if bucket_size > 1 else str(start) for start in starts]
+    return bar_series(labels, counts, colors)
+
+def top_recipes(data, top_n):
+    """Slowest and quickest top_n (name, cooking_time) rows of a DataFrame, slowest first"""
+    ordered = data.sort_values(['cooking_time', 'name'], ascending=[False, True], kind='stable')
+    rows = list(zip(ordered['name'], ordered['cooking_time']))
+    quickest_n = max(0, min(top_n, len(rows) - top_n))
+    return rows[:top_n], rows[len(rows) - quickest_n:]
+
+def numpy_histogram(cooking_times):
+    """
+    Histogram of cooking times with NumPy's automatic bin selection,
+    widened to a whole number of minutes and at most MAX_BUCKETS bins
+
+    Returns:
+        tuple: (bucket starts, counts, bucket size); no buckets when there are no cooking times
+    """
+    cooking_times = np.asarray(cooking_times, dtype=np.int64)
+    if not cooking_times.size:
+        return [], [], 1
+    low, high = int(cooking_times.min()), int(cooking_times.max())
+    edges = np.histogram_bin_edges(cooking_times, bins='auto')
+    bucket_size = max(int(np.ceil(edges[1] - edges[0])) if len(edges) > 1 else 1, 1)
+    bucket_size = max(bucket_size, pick_bucket_size(low, high))
+    first = low // bucket_size * bucket_size
+    edges = np.arange(first, high + bucket_size + 1, bucket_size)
+    counts, _ = np.histogram(cooking_times, bins=edges)
+    keep = counts > 0
+    return [int(start) for start in edges[:-1][keep]], [int(count) for count in counts[keep]], bucket_size
+
+def draw_chart(fig, series):
+    """Draw a chart series onto fig"""
+    ax = fig.add_subplot()
+    kind = series['kind']
+
+    if kind == 'bar':
+        ax.bar(series['labels'], series['values'], color=series['colors'] or None)
+    elif kind == 'pie':
+        ax.pie(series['values'], labels=series['labels'], autopct='%1.1f%%', colors=series['colors'])
+    elif kind == 'line':
+        ax.plot(series['x'], series['y'],
+                marker='o', color=series['color'], markerfacecolor=series['marker_color'],
+                markeredgecolor='white', markeredgewidth=2, linewidth=3)
+        if series.get('y_median'):
+            ax.plot(series['x'], series['y_median'], linestyle='--', color=series['marker_color'], linewidth=2)
+            ax.legend(['Average', 'Median'])
+
+    apply_figure_template(ax, series)
+
+def render_figure(series, output_format):
+    """Draw series on this thread's reusable figure and save it as output_format"""
+    fig = get_figure(series['chart_type'])
+    buffer = BytesIO()
+    try:
+        draw_chart(fig, series)
+        # specify layout details
+        fig.tight_layout()
+        fig.savefig(buffer, format=output_format)
+        return buffer.getvalue()
+    finally:
+        buffer.close()
+        # drop all artists so the reused figure holds no data between renders
+        fig.clear()
+
+def serialize_png(series):
+    """Rasterize the chart with Agg"""
+    return render_figure(series, 'png')
+
+def serialize_svg(series):
+    """Vector output: text stays text and ids are stable, so equal charts give equal bytes"""
+    with rc_context({'svg.fonttype': 'none', 'svg.hashsalt': 'recipes'}):
+        return render_figure(series, 'svg')
+
+def serialize_json(series):
+    """Compact series for client-side rendering; no matplotlib involved"""
+    return json.dumps(series, separators=(',', ':')).encode("utf-8")
+
+CHART_SERIALIZERS = {
+    'png': serialize_png,
+    'svg': serialize_svg,
+    'json': serialize_json,
+}
 
 def get_all_charts(data, **kwargs):
     """
     Generate all three chart types based on recipe data
     
+    The charts are rendered concurrently by the chart executor.
+    
     Args:
         data: pandas DataFrame with recipe data
         **kwargs: Additional parameters like labels, color_scheme
     
     Returns:
         dict: Dictionary containing all three charts with their types as keys
+              (None for a chart that failed or timed out)
     """
-    charts = {}
-    
-    # Generate bar chart
-    charts['bar'] = get_chart("#1", data, **kwargs)
-    
-    # Generate pie chart
-    charts['pie'] = get_chart("#2", data, **kwargs)
-    
-    # Generate line chart
-    charts['line'] = get_chart("#3", data, **kwargs)
-    
-    return charts
+    pngs = chart_executor.render([(chart_type, data, kwargs) for chart_type in CHART_TYPES.values()])
+    return {
+        name: base64.b64encode(png).decode("utf-8") if png is not None else None
+        for name, png in zip(CHART_TYPES, pngs)
+    }
 
 def get_chart_with_colors(chart_type, data, color_scheme='default', custom_colors=None):
     """
@@ -169,3 +490,53 @@ def get_chart_with_colors(chart_type, data, color_scheme='default', custom_color
         kwargs.update(custom_colors)
     
     return get_chart(chart_type, data, **kwargs)
+
+def pick_chart_format(chart_name, rows):
+    """
+    Pick the cheapest image format for a chart drawn from rows recipes
+
+    RECIPE_CHART_FORMAT forces 'png' or 'svg'; with 'auto' (the default) SVG
+    is used, as it renders faster and is smaller, except for bar charts with
+    many bars where the PNG is smaller. 'json' is not an image: the search
+    page shows charts in <img> tags, so it is rejected.
+    """
+    preferred = getattr(settings, 'RECIPE_CHART_FORMAT', 'auto')
+    if preferred in IMAGE_FORMATS:
+        return preferred
+    if preferred != 'auto':
+        raise ImproperlyConfigured(
+            f"RECIPE_CHART_FORMAT must be 'auto' or one of {', '.join(IMAGE_FORMATS)}, not {preferred!r}"
+        )
+    if chart_name == 'bar' and rows > SVG_MAX_BARS:
+        return 'png'
+    return 'svg'
+
+def store_charts(data, fingerprint, color_scheme='default', output_formats=None):
+    """
+    Make sure all three charts for fingerprint are in the chart store,
+    rendering the missing ones concurrently
+
+    Args:
+        output_formats: optional dict of chart name -> format ('png' if missing)
+
+    Returns:
+        dict: (chart key, format) by chart name ('bar', 'pie', 'line'); None
+              for a chart that failed or timed out
+    """
+    output_formats = output_formats or {}
+    charts = {}
+    for name, chart_type in CHART_TYPES.items():
+        output_format = output_formats.get(name, 'png')
+        charts[name] = (chart_key(chart_type, color_scheme, fingerprint, output_format), output_format)
+    missing = [name for name, chart in charts.items() if not chart_store.has_chart(*chart)]
+    rendered = chart_executor.render([
+        (CHART_TYPES[name], data, {'color_scheme': color_scheme, 'output_format': charts[name][1]})
+        for name in missing
+    ])
+    for name, chart in zip(missing, rendered):
+        if chart is None:
+            charts[name] = None
+        else:
+            key, output_format = charts[name]
+            chart_store.save_chart(key, chart, output_format)
+    return charts
@@ -1,63 +1,193 @@
+from django.conf import settings
 from django.views.generic import TemplateView, ListView, DetailView
 from django.shortcuts import render, redirect
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.cache import cache_control, cache_page
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
+from django.utils.decorators import method_decorator
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q
+from django.db.models import Count, Max
 from django.urls import reverse
 from .models import Recipe
 from .forms import RecipeSearchForm
-from .utils import get_all_charts, get_chart_with_colors
-import pandas as pd
-import re
+from .pagination import KeysetPaginator
+from .export import STREAM_FORMATS, STREAM_WRITERS, export_rows
+from .search import get_search_backend
+from .analytics import bar_count, fingerprint_summary, summarize_recipes
+from .chart_store import chart_store
+from .detail_cache import detail_cache
+from .images import image_url
+from .utils import CHART_FORMATS, CHART_TYPES, pick_chart_format, store_charts
 
-def process_wildcard_search(search_term):
-    """
-    Process wildcard search terms and convert them to Django Q objects
-    
-    Supports:
-    - * wildcards: "pasta*" matches "pasta", "pastas", "pasta-based"
-    - ? wildcards: "pasta?" matches "pasta" but not "pastas"
-    - Partial matching: "pasta" matches "Pasta al Pesto"
-    """
-    if not search_term:
-        return None
-    
-    # Remove extra whitespace
-    search_term = search_term.strip()
-    
-    # Handle wildcards
-    if '*' in search_term or '?' in search_term:
-        # Convert wildcards to regex patterns
-        # * becomes .* (any characters)
-        # ? becomes . (single character)
-        pattern = search_term.replace('*', '.*').replace('?', '.')
-        
-        # Create Q object for regex matching
-        return Q(name__iregex=pattern)
-    else:
-        # Regular partial matching (case-insensitive)
-        return Q(name__icontains=search_term)
+# Charts are immutable per key, let browsers and CDNs keep them for a year
+CHART_MAX_AGE = 60 * 60 * 24 * 365
 
+# Public pages change only with a deploy; vary_on_cookie keeps one copy per session (user)
+@method_decorator([cache_page(getattr(settings, 'RECIPE_PAGE_CACHE_TIMEOUT', 300)), vary_on_cookie], name='dispatch')
 class HomeView(TemplateView):
     template_name = 'recipes/home.html'
 
 
+def recipe_list_etag(request, *args, **kwargs):
+    """ETag of the recipe list: any insert, update or delete changes the count or the latest updated_at"""
+    if not request.user.is_authenticated:
+        return None
+    stats = Recipe.objects.aggregate(count=Count('id'), latest=Max('updated_at'))
+    latest = stats['latest'].timestamp() if stats['latest'] else 0
+    # The page shows who is logged in
+    return f"{stats['count']}-{latest}-{request.user.pk}"
+
+
+def get_cached_recipe(request, pk):
+    """detail_cache.get_recipe(pk), looked up once per request and shared by the view and its validators"""
+    if getattr(request, '_cached_recipe_pk', None) != pk:
+        request._cached_recipe = detail_cache.get_recipe(pk)
+        request._cached_recipe_pk = pk
+    return request._cached_recipe
+
+
+def recipe_detail_etag(request, pk):
+    if not request.user.is_authenticated:
+        return None
+    try:
+        _, version = get_cached_recipe(request, pk)
+    except Recipe.DoesNotExist:
+        return None
+    # The detail cache version changes whenever the recipe does
+    return f"{version}-{request.user.pk}"
+
+
+def recipe_detail_last_modified(request, pk):
+    if not request.user.is_authenticated:
+        return None
+    try:
+        recipe, _ = get_cached_recipe(request, pk)
+    except Recipe.DoesNotExist:
+        return None
+    return recipe.updated_at
+
+
+# Pages may be stored but must be revalidated, which costs one aggregate query
+# (list) or a detail cache lookup (detail) instead of a render
+@method_decorator([cache_control(no_cache=True), vary_on_cookie, condition(etag_func=recipe_list_etag)], name='dispatch')
 class RecipeListView(LoginRequiredMixin, ListView):
     model = Recipe
     template_name = 'recipes/list.html'
     context_object_name = 'recipes'
+    queryset = Recipe.objects.cards()
+    paginate_by = 12
+    page_size_options = (12, 24, 48)
 
+    def get_paginate_by(self, queryset):
+        # ?page_size= picks one of page_size_options, anything else falls back to the default
+        try:
+            page_size = int(self.request.GET.get('page_size', self.paginate_by))
+        except ValueError:
+            return self.paginate_by
+        return page_size if page_size in self.page_size_options else self.paginate_by
+
+    def paginate_queryset(self, queryset, page_size):
+        # Keyset pagination on (name, id) with ?after=/?before= cursors instead of ?page=
+        paginator = KeysetPaginator(queryset, page_size)
+        try:
+            page = paginator.page(after=self.request.GET.get('after'), before=self.request.GET.get('before'))
+        except ValueError:
+            raise Http404("Invalid page cursor")
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['page_size'] = context['paginator'].page_size
+        context['page_size_options'] = self.page_size_options
+        return context
+
+@method_decorator(
+    [cache_control(no_cache=True), vary_on_cookie,
+     condition(etag_func=recipe_detail_etag, last_modified_func=recipe_detail_last_modified)],
+    name='dispatch',
+)
 class RecipeDetailView(LoginRequiredMixin, DetailView):
     model = Recipe
     template_name = 'recipes/detail.html'
     context_object_name = 'recipe'
 
+    def get_object(self, queryset=None):
+        # Read through the detail cache, popular recipes skip the database
+        try:
+            recipe, self.detail_version = get_cached_recipe(self.request, self.kwargs['pk'])
+        except Recipe.DoesNotExist:
+            raise Http404("No recipe found matching the query")
+        return recipe
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Key and cache of the rendered page body, see the {% cache %} tag in detail.html
+        context['detail_version'] = self.detail_version
+        context['detail_cache_alias'] = detail_cache.cache_alias
+        context['detail_cache_timeout'] = detail_cache.ttl
+        return context
+
+
+def collect_search_results(qs, max_rows=None):
+    """
+    Materialize the search result cards in a single streaming pass over one SELECT
+
+    The charts do not need the rows, they are drawn from database aggregates
+    over the whole result set (see analytics.summarize_recipes).
+
+    Args:
+        qs: filtered/ordered Recipe queryset
+        max_rows: cap on the number of recipes materialized (None for all)
+
+    Returns:
+        dict: 'recipes' (card payload dicts) and 'truncated' (True when more
+              than max_rows recipes matched)
+    """
+    card_fields = ('short_description', 'recipe_image', 'image_renditions', 'ingredient_list')
+    rows = qs.analytics_rows(*card_fields)
+    if max_rows is not None:
+        # One extra row tells whether the cap cut the results
+        rows = rows[:max_rows + 1]
+
+    recipes_data = []
+    truncated = False
+    for (recipe_id, name, cooking_time, difficulty, ingredients, ingredient_count, updated_at,
+         short_description, recipe_image, image_renditions, ingredient_list) in rows.iterator():
+        if max_rows is not None and len(recipes_data) == max_rows:
+            truncated = True
+            break
+
+        recipes_data.append({
+            'id': recipe_id,
+            'name': name,  # Clean name without HTML
+            'cooking_time': cooking_time,
+            'difficulty': difficulty,
+            'ingredients': ingredients,
+            'ingredient_count': ingredient_count,
+            # Split at save time, iterated as is by the result cards
+            'ingredient_tuple': tuple(ingredient_list),
+            'short_description': short_description,
+            'recipe_image_url': image_url(recipe_image),
+            'image_renditions': image_renditions,
+            'detail_url': f"/recipes/{recipe_id}/"
+        })
+
+    return {
+        'recipes': recipes_data,
+        'truncated': truncated,
+    }
+
 
 @login_required
 def recipe_search(request):
     form = RecipeSearchForm(request.POST or None)
     recipes = None  # Initialize recipes
     charts = None
+    truncated = False
+    total = None
 
     if request.method == "POST":
         # Get form data
@@ -66,6 +196,7 @@ def recipe_search(request):
         ingredients = request.POST.get("ingredients")
         cooking_time_max = request.POST.get("cooking_time_max")
         difficulty = request.POST.get("difficulty")
+        ingredient_count_max = request.POST.get("ingredient_count_max")
 
         # Start with all recipes
         qs = Recipe.objects.all()
@@ -73,102 +204,116 @@ def recipe_search(request):
         # Apply filters only if user clicked "Search & Analyze" (not "Analyze All Recipes")
         if search_action == "search":
             # Apply filters based on form data (AND logic)
-            if recipe_name:
-                # Use wildcard processing for recipe names
-                name_query = process_wildcard_search(recipe_name)
-                if name_query:
-                    qs = qs.filter(name_query)
-            
-            if ingredients:
-                # Split ingredients by comma and search for each one with wildcard support
-                ingredient_list = [ingredient.strip() for ingredient in ingredients.split(",") if ingredient.strip()]
-                for ingredient in ingredient_list:
-                    if '*' in ingredient or '?' in ingredient:
-                        # Handle wildcards in ingredients
-                        pattern = ingredient.replace('*', '.*').replace('?', '.')
-                        qs = qs.filter(ingredients__iregex=pattern)
-                    else:
-                        # Regular partial matching for ingredients
-                        qs = qs.filter(ingredients__icontains=ingredient)
+            # Name and ingredient terms go through the configured search backend
+            # (full-text index where available, ranked by relevance)
+            ingredient_list = [ingredient.strip() for ingredient in (ingredients or "").split(",") if ingredient.strip()]
+            qs = get_search_backend().search(qs, name=recipe_name, ingredients=ingredient_list)
             
             if cooking_time_max:
                 qs = qs.filter(cooking_time__lte=int(cooking_time_max))
             
             if difficulty:
                 qs = qs.filter(difficulty=difficulty)
+
+            # Validated by the form; values it rejects (not a number, out of range) are ignored
+            form.is_valid()
+            if form.cleaned_data.get('ingredient_count_max'):
+                qs = qs.filter(ingredient_count__lte=form.cleaned_data['ingredient_count_max'])
         
         # If search_action == "show_all", no filters are applied (qs remains Recipe.objects.all())
 
-        # Convert QuerySet to list of dictionaries if we have results
-        if qs.exists():
-            recipes_data = []
-            for recipe in qs:
-                # Calculate ingredient count
-                ingredient_count = len([ing.strip() for ing in recipe.ingredients.split(",") if ing.strip()]) if recipe.ingredients else 0
-                
-                recipes_data.append({
-                    'id': recipe.id,
-                    'name': recipe.name,  # Clean name without HTML
-                    'cooking_time': recipe.cooking_time,
-                    'difficulty': recipe.difficulty,
-                    'ingredients': recipe.ingredients,
-                    'ingredient_count': ingredient_count,
-                    'short_description': recipe.short_description,
-                    'recipe_image_url': f'/static/images/{recipe.recipe_image}',
-                    'detail_url': f"/recipes/{recipe.id}/"
-                })
-            
-            # Create DataFrame for charts (we still need this for chart generation)
-            recipes_df = pd.DataFrame([{
-                'id': recipe.id,
-                'name': recipe.name,
-                'cooking_time': recipe.cooking_time,
-                'difficulty': recipe.difficulty,
-                'ingredients': recipe.ingredients,
-                'ingredient_count': len([ing.strip() for ing in recipe.ingredients.split(",") if ing.strip()]) if recipe.ingredients else 0,
-            } for recipe in qs])
-            
-            # Generate charts with different color schemes
+        form_data = {
+            'recipe_name': recipe_name,
+            'ingredients': ingredients,
+            'cooking_time_max': cooking_time_max,
+            'difficulty': difficulty,
+            'ingredient_count_max': ingredient_count_max
+        }
+
+        # Materialize the result cards in one query
+        results = collect_search_results(qs, getattr(settings, 'RECIPE_SEARCH_MAX_ROWS', 500))
+        if results['recipes']:
+            recipes = results['recipes']
+
+            # Charts are drawn from a few GROUP BY aggregates over all matches,
+            # keyed by the summary itself: equal summaries reuse stored charts
+            summary = summarize_recipes(qs)
+            fingerprint = fingerprint_summary(summary)
+            # The bar chart mode (all recipes, slowest/quickest or histogram)
+            # follows the result size, which bounds the number of bars
+            output_formats = {name: pick_chart_format(name, bar_count(summary)) for name in CHART_TYPES}
+
+            # Render (or reuse) the charts, missing ones in parallel; the page
+            # only needs their store keys
             charts = {
-                'bar': get_chart_with_colors('#1', recipes_df, color_scheme='brand'),
-                'pie': get_chart_with_colors('#2', recipes_df, color_scheme='brand'),
-                'line': get_chart_with_colors('#3', recipes_df, color_scheme='brand')
+                name: reverse('recipes:chart-image', args=chart) if chart else None
+                for name, chart in store_charts(summary, fingerprint, 'brand', output_formats).items()
             }
             
-            recipes = recipes_data
-            
-            # Store search results in session for redirect
-            request.session['search_recipes'] = recipes
-            request.session['search_charts'] = charts
-            request.session['search_form_data'] = {
-                'recipe_name': recipe_name,
-                'ingredients': ingredients,
-                'cooking_time_max': cooking_time_max,
-                'difficulty': difficulty
-            }
+            # Keep the results in the chart store for the redirect; the session
+            # only holds the short search key
+            request.session['search_key'] = chart_store.save_search({
+                'recipes': recipes,
+                'charts': charts,
+                'truncated': results['truncated'],
+                'total': summary['total'],
+                'form_data': form_data
+            })
             
             # Redirect to search results section
             return redirect(reverse('recipes:recipe-search') + '#search-results')
         else:
-            # Store form data in session for redirect
-            request.session['search_form_data'] = {
-                'recipe_name': recipe_name,
-                'ingredients': ingredients,
-                'cooking_time_max': cooking_time_max,
-                'difficulty': difficulty
-            }
+            request.session['search_key'] = chart_store.save_search({
+                'recipes': None,
+                'charts': None,
+                'form_data': form_data
+            })
             
             # No results found, redirect to no-results section
             return redirect(reverse('recipes:recipe-search') + '#no-recipes-found')
     
     # Check if we have stored search results from a redirect
-    if 'search_recipes' in request.session:
-        recipes = request.session.pop('search_recipes')
-        charts = request.session.pop('search_charts')
-        form_data = request.session.pop('search_form_data', {})
+    search = chart_store.get_search(request.session.pop('search_key', None))
+    searched = search is not None
+    if searched:
+        recipes = search['recipes']
+        charts = search['charts']
+        truncated = search.get('truncated', False)
+        total = search.get('total')
         
         # Pre-populate form with search data
-        form = RecipeSearchForm(initial=form_data)
+        form = RecipeSearchForm(initial=search['form_data'])
+
+    context = {"form": form, "recipes": recipes, "charts": charts, "searched": searched,
+               "truncated": truncated, "total": total}
+    return render(request, "recipes/search.html", context)
 
-    context = {"form": form, "recipes": recipes, "charts": charts}
-    return render(request, "recipes/search.html", context)
\ No newline at end of file
+
+def chart_etag(request, key, output_format):
+    # Chart keys are derived from the chart inputs, so the key is a valid ETag
+    return key if chart_store.has_chart(key, output_format) else None
+
+
+@condition(etag_func=chart_etag)
+def chart_image(request, key, output_format):
+    """Serve a rendered search chart (png, svg or json) from the chart store"""
+    # Only in the format it was stored in, so the content type always matches
+    chart = chart_store.get_chart(key, output_format) if output_format in CHART_FORMATS else None
+    if chart is None:
+        raise Http404("Chart not found")
+    response = HttpResponse(chart, content_type=CHART_FORMATS[output_format])
+    # Content-addressed: the bytes behind a key never change
+    patch_cache_control(response, public=True, max_age=CHART_MAX_AGE, immutable=True)
+    return response
+
+
+@login_required
+def recipe_export(request, export_format):
+    """Stream the whole recipe catalog as CSV or JSON Lines"""
+    if export_format not in STREAM_FORMATS:
+        raise Http404("Unknown export format")
+    response = StreamingHttpResponse(
+        STREAM_WRITERS[export_format](export_rows()), content_type=STREAM_FORMATS[export_format]
+    )
+    response['Content-Disposition'] = f'attachment; filename="recipes.{export_format}"'
+    return response